@@ -0,0 +1 @@
+"""Performance benchmarks for Command Explainer."""
@@ -0,0 +1,99 @@
+"""
+Microbenchmark for the Ollama stream decoder.
+
+Compares NDJSONDecoder over raw byte chunks against the previous
+aiter_lines + json.loads approach, reporting per-token overhead.
+
+Usage:
+    python -m benchmarks.bench_ndjson [--tokens N] [--chunk BYTES]
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from src.core.ndjson import NDJSONDecoder, JSON_BACKEND
+
+
+def build_stream(tokens: int) -> bytes:
+    """Build a realistic Ollama /api/generate NDJSON body."""
+    lines = [
+        json.dumps({
+            "model": "dolphin-mistral:7b",
+            "created_at": "2025-12-05T12:00:00.000000Z",
+            "response": f" tok{i}",
+            "done": False,
+        })
+        for i in range(tokens)
+    ]
+    lines.append(json.dumps({
+        "model": "dolphin-mistral:7b",
+        "response": "",
+        "done": True,
+        "context": list(range(2048)),
+        "total_duration": 5_000_000_000,
+        "eval_count": tokens,
+    }))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def chunked(body: bytes, size: int):
+    """Replay a body as fixed-size byte chunks, like aiter_bytes."""
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+async def lines_baseline(body: bytes, size: int) -> int:
+    """The original decoder: text lines, json.loads per line."""
+    count = 0
+    pending = ""
+    async for chunk in chunked(body, size):
+        pending += chunk.decode("utf-8")
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            if line:
+                data = json.loads(line)
+                if "response" in data:
+                    count += 1
+    return count
+
+
+async def decoder(body: bytes, size: int) -> int:
+    """NDJSONDecoder over raw bytes."""
+    count = 0
+    async for data in NDJSONDecoder().decode(chunked(body, size)):
+        if data.get("response"):
+            count += 1
+    return count
+
+
+def measure(fn, body: bytes, size: int, tokens: int, repeat: int) -> float:
+    """Best-of-N nanoseconds per token."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        asyncio.run(fn(body, size))
+        best = min(best, time.perf_counter_ns() - started)
+    return best / tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--chunk", type=int, default=4096)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    body = build_stream(args.tokens)
+    baseline = measure(lines_baseline, body, args.chunk, args.tokens, args.repeat)
+    current = measure(decoder, body, args.chunk, args.tokens, args.repeat)
+    
+    print(f"tokens={args.tokens} chunk={args.chunk}B backend={JSON_BACKEND}")
+    print(f"  aiter_lines + json.loads : {baseline:8.0f} ns/token")
+    print(f"  NDJSONDecoder            : {current:8.0f} ns/token")
+    print(f"  speedup                  : {baseline / current:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Cold-start benchmark for the cmdex entry point.
+
+Runs each subcommand in fresh interpreters, reporting wall-clock time
+above a bare ``python -c pass`` and, from ``-X importtime``, the modules
+that dominate its imports. Each case has a budget and a list of modules
+it must not import; ``--check`` exits non-zero when any case breaks
+either, so import regressions show up before a release.
+
+Budgets are milliseconds over the bare interpreter on a typical laptop;
+raise them only together with a note in the README's budget table.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs N] [--top N] [--check]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Dict, Tuple
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Libraries only the commands that talk to Ollama (or load settings) need
+NETWORK = ("asyncio", "httpx", "src.core.engine", "src.core.ollama_client")
+SETTINGS = ("pydantic", "yaml", "src.config.settings")
+
+
+@dataclass
+class Case:
+    """One entry point invocation and its startup budget."""
+    name: str
+    args: List[str]
+    budget_ms: float  # wall-clock over a bare interpreter
+    forbid: Tuple[str, ...] = ()  # modules this command must not import
+
+
+CASES: List[Case] = [
+    Case("--version", ["--version"], 20, ("click", "rich") + NETWORK + SETTINGS),
+    Case("--help", ["--help"], 150, NETWORK + SETTINGS),
+    Case("generate --help", ["generate", "--help"], 150, NETWORK + SETTINGS),
+    Case("explain --help", ["explain", "--help"], 150, NETWORK + SETTINGS),
+    Case("daemon status", ["daemon", "status"], 150, NETWORK + SETTINGS),
+    # Settings come from the config snapshot written by the warm-up run
+    Case("cache stats", ["cache", "stats"], 350, NETWORK + ("yaml",)),
+    Case("history top", ["history", "top"], 350, NETWORK + ("yaml",)),
+]
+
+
+def environment(home: str) -> Dict[str, str]:
+    """Run against a fresh home holding only the sample config, so no cache or daemon is picked up."""
+    config_dir = Path(home) / ".cmdex"
+    config_dir.mkdir()
+    (config_dir / "config.yaml").write_text((ROOT / "config.yaml").read_text())
+    env = dict(os.environ)
+    env.update({
+        "HOME": home,
+        "PYTHONPATH": str(ROOT),
+        "CMDEX_SOCKET": os.path.join(home, "cmdexd.sock"),
+        "XDG_RUNTIME_DIR": "",
+        "NO_COLOR": "1",
+    })
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def wall_clock(command: List[str], env: Dict[str, str], cwd: str, runs: int) -> float:
+    """Median seconds to run a command to completion."""
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command, env=env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def import_times(args: List[str], env: Dict[str, str], cwd: str) -> Dict[str, int]:
+    """Cumulative import time in microseconds of every module a command loads."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        env=env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    modules: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per case")
+    parser.add_argument("--top", type=int, default=3, help="Heaviest imports to list per case")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if any case is over budget")
+    args = parser.parse_args()
+    
+    failures = 0
+    with tempfile.TemporaryDirectory() as home:
+        env = environment(home)
+        # Populate __pycache__ and the settings snapshot so neither is counted
+        for case in CASES:
+            subprocess.run([sys.executable, "-m", "src.client", *case.args], env=env, cwd=home,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        bare = wall_clock([sys.executable, "-c", "pass"], env, home, args.runs)
+        # Imported by the interpreter itself (site hooks), not by cmdex
+        preloaded = set(import_times(["-c", "pass"], env, home))
+        print(f"bare interpreter: {bare * 1000:.1f} ms (median of {args.runs})\n")
+        print(f"{'command':<18} {'total':>8} {'startup':>8} {'budget':>8}  heaviest imports")
+        
+        for case in CASES:
+            total = wall_clock([sys.executable, "-m", "src.client", *case.args], env, home, args.runs)
+            startup_ms = (total - bare) * 1000
+            modules = import_times(["-m", "src.client", *case.args], env, home)
+            own = {
+                name: us for name, us in modules.items()
+                if name not in preloaded and ("." not in name or name.startswith("src."))
+            }
+            heaviest = sorted(own.items(), key=lambda item: -item[1])[:args.top]
+            forbidden = [name for name in case.forbid if name in modules]
+            
+            over = startup_ms > case.budget_ms
+            status = "OVER" if over else "ok"
+            print(
+                f"{case.name:<18} {total * 1000:>6.1f}ms {startup_ms:>6.1f}ms {case.budget_ms:>6.0f}ms  "
+                + ", ".join(f"{name} {us / 1000:.1f}ms" for name, us in heaviest)
+                + f"  [{status}]"
+            )
+            if forbidden:
+                print(f"{'':<18} imports {', '.join(forbidden)} (not allowed)")
+            if over or forbidden:
+                failures += 1
+    
+    if args.check and failures:
+        print(f"\n{failures} case(s) over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
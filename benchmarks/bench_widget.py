@@ -0,0 +1,78 @@
+"""
+Round-trip benchmark for the shell keybinding widgets.
+
+Runs ``cmdex widget`` in fresh interpreters against a running cmdexd with
+the answer already cached, the path a keypress takes, and reports the
+round trip next to a bare ``python -c pass``. ``--check`` exits non-zero
+when the median round trip is over budget.
+
+Needs a running daemon (``cmdex daemon start --detach``); the first,
+uncached call also needs Ollama.
+
+Usage:
+    python -m benchmarks.bench_widget [--runs N] [--budget MS] [--check] [TEXT]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Dict
+
+from src.core import protocol
+
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def timed(command: List[str], env: Dict[str, str], runs: int) -> List[float]:
+    """Seconds each of ``runs`` fresh runs of a command took."""
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("text", nargs="?", default="list files by size", help="Description to generate from")
+    parser.add_argument("--runs", type=int, default=20, help="Fresh interpreters to time")
+    parser.add_argument("--budget", type=float, default=50, help="Median round trip budget in ms")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if the median is over budget")
+    args = parser.parse_args()
+    
+    if protocol.request({"op": "status"}, timeout=1.0) is None:
+        print(f"cmdexd is not running on {protocol.socket_path()}; start it with `cmdex daemon start --detach`")
+        sys.exit(2)
+    
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+    widget = [sys.executable, "-m", "src.client", "widget", "generate", "--", args.text]
+    
+    # Fill the cache (and __pycache__); this one may wait on the model
+    primed = subprocess.run(widget[:5] + ["--deadline", "300"] + widget[5:], env=env, capture_output=True, text=True)
+    if primed.returncode != 0:
+        print(f"Priming failed ({primed.returncode}): {primed.stdout.strip()}")
+        sys.exit(2)
+    
+    bare = statistics.median(timed([sys.executable, "-c", "pass"], env, args.runs))
+    times = sorted(timed(widget, env, args.runs))
+    median = statistics.median(times)
+    p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+    
+    print(f"bare interpreter: {bare * 1000:.1f} ms (median of {args.runs})")
+    print(f"widget round trip: {median * 1000:.1f} ms median, {p95 * 1000:.1f} ms p95 "
+          f"({(median - bare) * 1000:.1f} ms over bare), budget {args.budget:.0f} ms")
+    
+    if args.check and median * 1000 > args.budget:
+        print("over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
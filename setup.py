@@ -16,9 +16,14 @@ setup(
         "pyyaml>=6.0",
         "pydantic>=2.0",
     ],
+    extras_require={
+        "http2": ["httpx[http2]"],
+        "fast": ["orjson>=3.9"],
+    },
     entry_points={
         "console_scripts": [
-            "cmdex=src.main:main",
+            "cmdex=src.client:main",
+            "cmdexd=src.main:daemon_main",
         ],
     },
     classifiers=[
@@ -0,0 +1,132 @@
+"""
+Thin command-line front end for Command Explainer.
+Forwards one-shot generate/explain calls to a running cmdexd over its Unix
+socket and falls back to the full CLI (src.main) for everything else.
+"""
+
+import os
+import sys
+from typing import Optional, List, Dict, Any
+
+from src.core import protocol
+
+
+# Options the daemon understands; anything else runs in-process
+FLAGS = {"--no-cache": "no_cache", "--stats": "stats"}
+PERSONAS = ("general", "security")
+
+
+def parse(argv: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Turn a simple ``generate``/``explain`` invocation into a daemon request.
+
+    Returns None for anything the daemon doesn't handle (other commands,
+    batch and pipe modes, help, unknown options), which then goes to the
+    full CLI so its usual parsing and errors apply.
+    """
+    if not argv or argv[0] not in ("generate", "explain"):
+        return None
+    request: Dict[str, Any] = {"op": argv[0]}
+    args = iter(argv[1:])
+    text = None
+    for arg in args:
+        if arg in FLAGS:
+            request[FLAGS[arg]] = True
+        elif arg in ("-p", "--persona"):
+            request["persona"] = next(args, None)
+        elif arg.startswith("--persona="):
+            request["persona"] = arg.split("=", 1)[1]
+        elif arg.startswith("-") or text is not None:
+            return None
+        else:
+            text = arg
+    if not text or request.get("persona", "general") not in PERSONAS:
+        return None
+    request["text"] = text
+    return request
+
+
+def terminal() -> Dict[str, Any]:
+    """How the daemon should render output for this terminal."""
+    try:
+        width = os.get_terminal_size(sys.stdout.fileno()).columns
+    except (OSError, ValueError):
+        width = int(os.environ.get("COLUMNS", 80))
+    color = None
+    if sys.stdout.isatty() and not os.environ.get("NO_COLOR"):
+        if os.environ.get("COLORTERM") in ("truecolor", "24bit"):
+            color = "truecolor"
+        elif "256" in os.environ.get("TERM", ""):
+            color = "256"
+        else:
+            color = "standard"
+    return {"width": width, "color": color}
+
+
+def forward(request: Dict[str, Any]) -> Optional[int]:
+    """
+    Run a request on the daemon, copying its output to this terminal.
+
+    Returns the exit status, or None when the request should run
+    in-process instead (no daemon, or one speaking another protocol
+    version, or one that went away before answering).
+    """
+    sock = protocol.connect()
+    if sock is None:
+        return None
+    request = dict(request, v=protocol.VERSION, shell=os.environ.get("SHELL", ""), **terminal())
+    answered = False
+    with sock:
+        try:
+            sock.sendall(protocol.pack(request))
+            while True:
+                message = protocol.recv(sock)
+                if message is None or message.get("fallback"):
+                    break
+                answered = True
+                if "out" in message:
+                    sys.stdout.write(message["out"])
+                    sys.stdout.flush()
+                if "err" in message:
+                    sys.stderr.write(message["err"])
+                    sys.stderr.flush()
+                if "exit" in message:
+                    return int(message["exit"])
+        except (OSError, protocol.ProtocolError):
+            pass
+    if not answered:
+        return None
+    sys.stderr.write("\ncmdex: lost connection to cmdexd\n")
+    return 1
+
+
+def main():
+    """Console entry point: use the daemon when one is running, else the full CLI."""
+    if sys.argv[1:] in (["--version"], ["-v"]):
+        # Nothing to load for this one
+        from src import __version__
+        print(f"cmdex version {__version__}")
+        return
+    
+    if sys.argv[1:2] == ["widget"]:
+        # Shell keybindings: daemon only, under a deadline
+        from src import widget
+        sys.exit(widget.main(sys.argv[2:]))
+    
+    request = None if os.environ.get("CMDEX_NO_DAEMON") else parse(sys.argv[1:])
+    if request is not None:
+        try:
+            status = forward(request)
+        except KeyboardInterrupt:
+            # Closing the socket makes the daemon cancel the request
+            sys.stderr.write("\nCancelled\n")
+            sys.exit(130)
+        if status is not None:
+            sys.exit(status)
+    
+    from src.main import main as cli_main
+    cli_main()
+
+
+if __name__ == "__main__":
+    main()
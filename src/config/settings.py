@@ -3,31 +3,158 @@ Configuration settings management for Command Explainer.
 Loads settings from config.yaml and environment variables.
 """
 
+import json
 import os
+import tempfile
+import typing
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
-import yaml
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
-class OllamaSettings(BaseModel):
+# Bumped when the snapshot layout changes
+SNAPSHOT_VERSION = 1
+
+
+class SettingsModel(BaseModel):
+    """Base for settings sections; validators are built on first use, not at import."""
+    model_config = ConfigDict(defer_build=True)
+
+
+class TransportSettings(SettingsModel):
+    """HTTP connection pool configuration for talking to Ollama."""
+    max_connections: int = 10
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 60.0  # seconds an idle connection stays open
+    connect_timeout: float = 5.0
+    http2: bool = False  # requires the h2 package (pip install cmdex[http2])
+    uds: Optional[str] = None  # Unix socket path for a proxied local Ollama
+
+
+class HostSettings(SettingsModel):
+    """A single Ollama endpoint in a multi-host pool."""
+    url: str
+    weight: float = 1.0  # relative capacity; a weight-2 host takes twice the requests
+
+
+class PoolSettings(SettingsModel):
+    """Health tracking for multi-host pools."""
+    eject_after: int = 3  # consecutive failures before a host is taken out of rotation
+    eject_seconds: float = 30.0  # how long an ejected host sits out
+    models_ttl: float = 60.0  # seconds before re-fetching a host's model list
+
+
+class RetrySettings(SettingsModel):
+    """Retry policy for failures before the first token."""
+    attempts: int = 3  # total attempts, including the first
+    backoff_base: float = 0.5  # seconds; doubles every retry, with full jitter
+    backoff_max: float = 8.0
+
+
+class HedgeSettings(SettingsModel):
+    """Duplicate a request to another host when its first token is unusually slow."""
+    enabled: bool = False
+    percentile: float = 0.95  # hedge after this percentile of observed TTFT
+    min_samples: int = 20  # TTFT samples needed before the percentile is trusted
+    delay: float = 10.0  # seconds to wait before hedging until then
+    min_delay: float = 0.5
+    window: int = 200  # most recent TTFT samples kept
+
+
+class BreakerSettings(SettingsModel):
+    """Circuit breaker for a dead or unreachable Ollama."""
+    threshold: int = 3  # consecutive connection failures before failing fast
+    cooldown: float = 15.0  # seconds to fail fast before trying again
+
+
+class LimiterSettings(SettingsModel):
+    """Adaptive per-host concurrency limit, driven by observed latency."""
+    enabled: bool = True
+    initial: float = 2.0  # starting limit per host
+    min: int = 1
+    max: int = 16
+    tolerance: float = 1.5  # TTFT or per-token latency above baseline x this shrinks the limit
+    backoff: float = 0.7  # multiplicative decrease
+
+
+class SchedulerSettings(SettingsModel):
+    """Priority scheduling of requests within one engine."""
+    slots: int = 4  # requests in flight at once; match OLLAMA_NUM_PARALLEL (summed across hosts)
+    preempt: bool = True  # cancel and re-queue background work when an interactive request waits
+
+
+class OllamaSettings(SettingsModel):
     """Ollama API configuration."""
     host: str = "http://localhost:11434"
     model: str = "dolphin-phi:2.7b"
     timeout: int = 120
+    keep_alive: str = "30m"  # how long Ollama keeps the model loaded after a request
+    keepalive_refresh: int = 600  # seconds idle before a long-lived session re-pings the model
+    max_context_tokens: int = 8192  # chat history is reset once its context grows past this
+    hosts: List[HostSettings] = Field(default_factory=list)  # overrides host when set
+    pool: PoolSettings = Field(default_factory=PoolSettings)
+    transport: TransportSettings = Field(default_factory=TransportSettings)
+    retry: RetrySettings = Field(default_factory=RetrySettings)
+    hedge: HedgeSettings = Field(default_factory=HedgeSettings)
+    breaker: BreakerSettings = Field(default_factory=BreakerSettings)
+    scheduler: SchedulerSettings = Field(default_factory=SchedulerSettings)
+    limiter: LimiterSettings = Field(default_factory=LimiterSettings)
+    state_ttl: float = 30.0  # seconds health and model list results are reused
+
+
+class CacheSettings(SettingsModel):
+    """Persistent response cache configuration."""
+    enabled: bool = True
+    path: str = "~/.cmdex/cache.db"
+    max_entries: int = 5000
+    max_age_days: int = 30
+    digest_ttl: int = 300  # seconds before re-checking a model's digest
+
+
+class BatchSettings(SettingsModel):
+    """Batch processing configuration."""
+    concurrency: int = 4  # parallel requests; match Ollama's OLLAMA_NUM_PARALLEL
+    jobs_dir: str = "~/.cmdex/jobs"  # checkpoint journals for --resume
+    max_attempts: int = 3  # tries per failed item across resumes
+    keep_days: int = 7  # journals older than this are deleted when a new job starts
+
+
+class HistorySettings(SettingsModel):
+    """Shell history ingestion configuration."""
+    files: List[str] = Field(default_factory=list)  # empty: ~/.bash_history and ~/.zsh_history
+    path: str = "~/.cmdex/history.db"  # ingest offsets and command frequencies
+    limit: int = 200  # most frequent new commands explained per run
+    concurrency: int = 1  # keep ingest from competing with interactive requests
+    ignore: List[str] = Field(
+        default_factory=lambda: ["cd", "ls", "ll", "pwd", "clear", "exit", "history", "cmdex"]
+    )
+
 
+class ServeSettings(SettingsModel):
+    """HTTP API served by `cmdex serve`."""
+    host: str = "127.0.0.1"  # 0.0.0.0 to accept other machines
+    port: int = 8765
+    token: Optional[str] = None  # when set, required as "Authorization: Bearer <token>"
+    max_waiting: int = 32  # requests in progress beyond the scheduler's slots before answering 503
+    max_body: int = 1048576  # bytes
+    idle_timeout: float = 60.0  # seconds an idle keep-alive connection stays open
 
-class PersonaSettings(BaseModel):
+
+class PersonaSettings(SettingsModel):
     """Persona configuration."""
     default: str = "general"
     available: List[str] = Field(default_factory=lambda: ["general", "security"])
 
 
-class Settings(BaseModel):
+class Settings(SettingsModel):
     """Application settings."""
     ollama: OllamaSettings = Field(default_factory=OllamaSettings)
     personas: PersonaSettings = Field(default_factory=PersonaSettings)
+    cache: CacheSettings = Field(default_factory=CacheSettings)
+    batch: BatchSettings = Field(default_factory=BatchSettings)
+    history: HistorySettings = Field(default_factory=HistorySettings)
+    serve: ServeSettings = Field(default_factory=ServeSettings)
     
     @classmethod
     def load(cls, config_path: Optional[Path] = None) -> "Settings":
@@ -38,6 +165,9 @@ class Settings(BaseModel):
         1. Provided path
         2. Current directory
         3. User's home directory (~/.cmdex/config.yaml)
+        
+        A validated snapshot is kept next to the config file (see
+        load_file), so only the first start after an edit parses YAML.
         """
         search_paths = []
         
@@ -51,12 +181,44 @@ class Settings(BaseModel):
         
         for path in search_paths:
             if path.exists():
-                with open(path, "r") as f:
-                    data = yaml.safe_load(f)
-                    return cls.model_validate(data) if data else cls()
+                return cls.load_file(path)
         
         # Return defaults if no config found
-        return cls()
+        return cls.defaults()
+    
+    @classmethod
+    def defaults(cls) -> "Settings":
+        """Settings with every default, built without running validation."""
+        return _construct(cls, {})
+    
+    @classmethod
+    def load_file(cls, path: Path) -> "Settings":
+        """
+        Load one config file, through its snapshot when that is current.
+        
+        The snapshot (``.config.yaml.snapshot.json`` beside ``config.yaml``)
+        holds the validated settings as JSON, keyed on the config's path,
+        mtime and size and on this module's own mtime and size. A matching
+        snapshot is read back with one small JSON parse and no YAML or
+        validation; otherwise the YAML is loaded and validated as usual and
+        the snapshot rewritten. A directory that can't be written to just
+        means no snapshot.
+        """
+        key = _snapshot_key(path)
+        snapshot = _read_snapshot(snapshot_path(path))
+        if snapshot is not None and snapshot.get("key") == key:
+            return _construct(cls, snapshot["settings"])
+        
+        import yaml
+        with open(path, "r") as f:
+            data = yaml.safe_load(f)
+        settings = cls.model_validate(data) if data else cls.defaults()
+        _write_snapshot(snapshot_path(path), {"key": key, "settings": settings.model_dump(mode="json")})
+        return settings
+    
+    def get_hosts(self) -> List[HostSettings]:
+        """Get the configured Ollama endpoints (a single host unless a pool is set)."""
+        return self.ollama.hosts or [HostSettings(url=self.ollama.host)]
     
     def get_model(self) -> str:
         """Get the configured Ollama model, with env override support."""
@@ -67,6 +229,89 @@ class Settings(BaseModel):
         return os.environ.get("CMDEX_PERSONA", self.personas.default)
 
 
+def snapshot_path(config_path: Path) -> Path:
+    """Where the validated snapshot of a config file is kept."""
+    return config_path.with_name(f".{config_path.name}.snapshot.json")
+
+
+def _snapshot_key(config_path: Path) -> Dict[str, Any]:
+    # This module's stat stands in for the schema: upgrading cmdex (or
+    # editing a model) invalidates every snapshot
+    config = config_path.stat()
+    schema = os.stat(__file__)
+    return {
+        "version": SNAPSHOT_VERSION,
+        "path": os.path.abspath(config_path),
+        "mtime_ns": config.st_mtime_ns,
+        "size": config.st_size,
+        "schema": [schema.st_mtime_ns, schema.st_size],
+    }
+
+
+def _read_snapshot(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "rb") as f:
+            snapshot = json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+    return snapshot if isinstance(snapshot, dict) else None
+
+
+def _write_snapshot(path: Path, snapshot: Dict[str, Any]):
+    # Written to a temporary file and renamed, so a concurrent start never
+    # reads half a snapshot
+    try:
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    except OSError:
+        return
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+
+
+def _construct(model: type, data: Dict[str, Any]) -> SettingsModel:
+    """
+    Build a model, and its nested sections, from already-validated data.
+    
+    Uses model_construct throughout, so no validator is built or run.
+    Sections missing from ``data`` get their defaults the same way.
+    """
+    values = {}
+    for name, field in model.model_fields.items():
+        if name in data:
+            values[name] = _construct_value(field.annotation, data[name])
+        elif _is_section(field.annotation):
+            values[name] = _construct(field.annotation, {})
+    return model.model_construct(**values)
+
+
+def _construct_value(annotation: Any, value: Any) -> Any:
+    if value is None:
+        return None
+    if _is_section(annotation):
+        return _construct(annotation, value)
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is list and args:
+        return [_construct_value(args[0], item) for item in value]
+    if origin is typing.Union:
+        # Optional[X]: the value is the non-None member
+        members = [arg for arg in args if arg is not type(None)]
+        if len(members) == 1:
+            return _construct_value(members[0], value)
+    return value
+
+
+def _is_section(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, SettingsModel)
+
+
 # Global settings instance
 _settings: Optional[Settings] = None
 
@@ -0,0 +1,280 @@
+"""
+Bounded-concurrency batch pipeline.
+Streams inputs through an async worker pool and emits results in input order.
+"""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import (
+    AsyncGenerator, AsyncIterable, Awaitable, Callable, Optional, Dict, Any, TextIO, Tuple, TypeVar
+)
+
+from src.core.stats import RequestStats
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one batch item."""
+    index: int
+    input: str
+    output: Optional[str] = None
+    error: Optional[str] = None
+    stats: Optional[RequestStats] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+    resumed: bool = False  # restored from a job journal rather than run
+    retry: bool = True  # False when running it again would fail the same way
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+    
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any], resumed: bool = False) -> "BatchResult":
+        """Rebuild a result from its to_dict() record; stats stay a plain dict."""
+        record = dict(record)
+        return cls(
+            index=record.pop("index"),
+            input=record.pop("input"),
+            output=record.pop("output", None),
+            error=record.pop("error", None),
+            extra=record,
+            resumed=resumed
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        record = {
+            "index": self.index,
+            "input": self.input,
+            "output": self.output,
+            "error": self.error,
+        }
+        record.update(self.extra)
+        if self.stats is not None:
+            record["stats"] = self.stats.to_dict()
+        return record
+
+
+async def read_lines(source: TextIO, read_ahead: int = 64) -> AsyncGenerator[str, None]:
+    """
+    Yield stripped, non-empty lines from a file object without blocking the loop.
+    
+    Lines are read in a daemon thread, at most ``read_ahead`` ahead of
+    the consumer, so stdin can be a live pipe and large files are never
+    loaded whole. A daemon thread rather than the default executor, so
+    Ctrl-C during a blocked read doesn't wait at exit for the next line.
+    """
+    loop = asyncio.get_running_loop()
+    lines: asyncio.Queue = asyncio.Queue()
+    room = threading.Semaphore(read_ahead)
+    stopped = threading.Event()
+    
+    def _hand_over(item):
+        try:
+            loop.call_soon_threadsafe(lines.put_nowait, item)
+        except RuntimeError:
+            # The loop is gone; nobody is reading any more
+            stopped.set()
+    
+    def _read():
+        while not stopped.is_set():
+            room.acquire()
+            if stopped.is_set():
+                return
+            try:
+                line = source.readline()
+            except Exception as e:
+                _hand_over(e)
+                return
+            _hand_over(line)
+            if not line:
+                return
+    
+    threading.Thread(target=_read, daemon=True).start()
+    try:
+        while True:
+            line = await lines.get()
+            room.release()
+            if isinstance(line, Exception):
+                raise line
+            if not line:
+                return
+            line = line.strip()
+            if line:
+                yield line
+    finally:
+        stopped.set()
+        room.release()
+
+
+async def enumerate_lines(source: TextIO) -> AsyncGenerator[Tuple[int, str], None]:
+    """Yield (index, line) for the non-empty lines of a file object."""
+    index = 0
+    async for line in read_lines(source):
+        yield index, line
+        index += 1
+
+
+async def ordered_map(
+    source: AsyncIterable[T],
+    worker: Callable[[T], Awaitable[R]],
+    concurrency: int,
+    window: Optional[int] = None
+) -> AsyncGenerator[R, None]:
+    """
+    Apply an async worker to a stream of inputs with bounded concurrency.
+    
+    At most ``concurrency`` workers run at once and at most ``window``
+    inputs are in flight or waiting to be emitted, so memory stays bounded
+    however long the input is. Results are yielded in input order.
+    Workers should capture their own errors; an exception from a worker
+    aborts the whole pipeline.
+    """
+    concurrency = max(concurrency, 1)
+    limit = asyncio.Semaphore(concurrency)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=window or concurrency * 2)
+    
+    async def run(item: T) -> R:
+        async with limit:
+            return await worker(item)
+    
+    async def produce():
+        async for item in source:
+            await queue.put(asyncio.ensure_future(run(item)))
+        await queue.put(None)
+    
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            get = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({get, producer}, return_when=asyncio.FIRST_COMPLETED)
+            if get not in done and producer.exception() is not None:
+                # The reader failed; surface its error instead of waiting forever
+                get.cancel()
+                await producer
+            task = await get
+            if task is None:
+                break
+            yield await task
+        await producer
+    finally:
+        producer.cancel()
+        pending = [producer]
+        while not queue.empty():
+            task = queue.get_nowait()
+            if task is not None:
+                task.cancel()
+                pending.append(task)
+        # Wait for cancelled workers to close their requests
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def unordered_map(
+    source: AsyncIterable[T],
+    worker: Callable[[T], Awaitable[R]],
+    concurrency: int
+) -> AsyncGenerator[R, None]:
+    """
+    Apply an async worker to a stream of inputs, yielding results as they finish.
+    
+    At most ``concurrency`` inputs are in flight. The next input is only
+    pulled once a slot is free, and finished results are emitted while
+    the source is still waiting for input, so a slow pipe upstream never
+    holds back work that is already done.
+    """
+    concurrency = max(concurrency, 1)
+    iterator = source.__aiter__()
+    running: set = set()
+    fetch: Optional[asyncio.Future] = None
+    exhausted = False
+    
+    try:
+        while True:
+            if fetch is None and not exhausted and len(running) < concurrency:
+                fetch = asyncio.ensure_future(iterator.__anext__())
+            waiting = running | ({fetch} if fetch is not None else set())
+            if not waiting:
+                return
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            
+            finished = done & running
+            if fetch in done:
+                try:
+                    running.add(asyncio.ensure_future(worker(fetch.result())))
+                except StopAsyncIteration:
+                    exhausted = True
+                fetch = None
+            for task in finished:
+                running.discard(task)
+                yield task.result()
+    finally:
+        pending = list(running)
+        if fetch is not None:
+            pending.append(fetch)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+class Throughput:
+    """Running totals for a batch, for progress and the final summary."""
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.done = 0
+        self.failed = 0
+        self.cached = 0
+        self.resumed = 0
+        self.latencies = []
+        self.concurrency_limit: Optional[float] = None
+    
+    def add(self, result: BatchResult):
+        self.done += 1
+        if not result.ok:
+            self.failed += 1
+        if result.resumed:
+            self.resumed += 1
+        if result.stats is not None:
+            if result.stats.cached:
+                self.cached += 1
+            if result.stats.total_time is not None:
+                self.latencies.append(result.stats.total_time)
+            if result.stats.concurrency_limit is not None:
+                self.concurrency_limit = result.stats.concurrency_limit
+    
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+    
+    @property
+    def rate(self) -> float:
+        """Items completed per second."""
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+    
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Latency percentile in seconds over completed items."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+    
+    def summary(self) -> str:
+        p50 = self.percentile(0.5)
+        p95 = self.percentile(0.95)
+        latency = (
+            f" · latency p50 {p50:.2f}s p95 {p95:.2f}s" if p50 is not None else ""
+        )
+        limit = (
+            f" · host limit {self.concurrency_limit:.1f}"
+            if self.concurrency_limit is not None else ""
+        )
+        resumed = f", {self.resumed} resumed" if self.resumed else ""
+        return (
+            f"{self.done} items ({self.failed} failed, {self.cached} cached{resumed}) "
+            f"in {self.elapsed:.1f}s · {self.rate:.2f} items/s{latency}{limit}"
+        )
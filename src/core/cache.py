@@ -0,0 +1,205 @@
+"""
+Persistent response cache for Command Explainer.
+Stores completed LLM responses in SQLite so repeated requests return instantly.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, Tuple
+
+from src.config.settings import get_settings
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at);
+CREATE INDEX IF NOT EXISTS idx_responses_created ON responses(created_at);
+CREATE TABLE IF NOT EXISTS digests (
+    model TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of completed responses.
+
+    Uses WAL journaling and a busy timeout so many concurrent cmdex
+    processes can share one database file. Entries are evicted by age
+    and, beyond the configured size, least recently used first.
+    Cache failures never propagate; a broken cache behaves as a miss.
+    """
+    
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        max_age_days: Optional[int] = None,
+        digest_ttl: Optional[int] = None
+    ):
+        settings = get_settings()
+        self.path = Path(path or settings.cache.path).expanduser()
+        self.max_entries = max_entries or settings.cache.max_entries
+        self.max_age = (max_age_days or settings.cache.max_age_days) * 86400
+        self.digest_ttl = digest_ttl if digest_ttl is not None else settings.cache.digest_ttl
+        self._conn: Optional[sqlite3.Connection] = None
+        self.unavailable = False
+    
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open the database on first use.
+
+        A cache that can't be created (read-only home, a file where the
+        directory should be) stays off for the rest of the session; the
+        failure is raised as sqlite3.Error so callers treat it as a miss.
+        """
+        if self._conn is None:
+            if self.unavailable:
+                raise sqlite3.OperationalError(f"Response cache {self.path} is unavailable")
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            except OSError as e:
+                self.unavailable = True
+                raise sqlite3.OperationalError(f"Response cache {self.path} is unavailable: {e}") from e
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+    
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        """Build a stable cache key from the request components."""
+        blob = json.dumps(parts, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached response, or None on a miss or expired entry."""
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if now - row[1] > self.max_age:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute(
+                "UPDATE responses SET accessed_at = ?, hits = hits + 1 WHERE key = ?",
+                (now, key)
+            )
+            return row[0]
+        except sqlite3.Error:
+            return None
+    
+    def contains(self, key: str) -> bool:
+        """Whether an unexpired response is cached, without counting a hit."""
+        try:
+            row = self._connect().execute(
+                "SELECT 1 FROM responses WHERE key = ? AND created_at >= ?",
+                (key, time.time() - self.max_age)
+            ).fetchone()
+        except sqlite3.Error:
+            return False
+        return row is not None
+    
+    def put(self, key: str, response: str, model: str, mode: str):
+        """Store a completed response and evict anything out of bounds."""
+        if not response:
+            return
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, mode, response, created_at, accessed_at, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (key, model, mode, response, now, now)
+            )
+            self._evict(conn, now)
+        except sqlite3.Error:
+            pass
+    
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired entries, then the least recently used beyond max_entries."""
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.max_age,))
+        conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+    
+    def get_digest(self, model: str) -> Tuple[Optional[str], bool]:
+        """
+        Return the last fetched digest for a model, and whether it is fresh.
+
+        A digest older than ``digest_ttl`` is still returned so callers can
+        keep using it while they re-check the model.
+        """
+        try:
+            row = self._connect().execute(
+                "SELECT digest, fetched_at FROM digests WHERE model = ?", (model,)
+            ).fetchone()
+        except sqlite3.Error:
+            return None, False
+        if row is None:
+            return None, False
+        return row[0], time.time() - row[1] <= self.digest_ttl
+    
+    def put_digest(self, model: str, digest: str):
+        """Remember a model's digest so cache keys can be built offline."""
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO digests (model, digest, fetched_at) VALUES (?, ?, ?)",
+                (model, digest, time.time())
+            )
+        except sqlite3.Error:
+            pass
+    
+    def stats(self) -> Dict[str, Any]:
+        """Summarize cache contents."""
+        try:
+            row = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(LENGTH(response)), 0) "
+                "FROM responses"
+            ).fetchone()
+        except sqlite3.Error:
+            row = (0, 0, 0)
+        return {
+            "path": str(self.path),
+            "entries": row[0],
+            "hits": row[1],
+            "bytes": row[2],
+            "max_entries": self.max_entries,
+        }
+    
+    def clear(self):
+        """Remove all cached responses and digests."""
+        try:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.execute("DELETE FROM digests")
+        except sqlite3.Error:
+            pass
+    
+    def close(self):
+        """Close the database connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
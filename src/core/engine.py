@@ -2,23 +2,23 @@
 Core engine orchestrating command generation and explanation.
 """
 
+import asyncio
+import importlib
 import platform
 import os
-from typing import Optional, AsyncGenerator
+import time
+from dataclasses import dataclass
+from typing import Optional, AsyncGenerator, Awaitable, Callable, List, Tuple, Dict, Any
 from enum import Enum
 
-from src.core.ollama_client import OllamaClient
-from src.prompts.base import GeneratePrompt, ExplainPrompt, InteractivePrompt
-from src.prompts.personas.general import (
-    GeneralGeneratePrompt,
-    GeneralExplainPrompt, 
-    GeneralInteractivePrompt
-)
-from src.prompts.personas.security import (
-    SecurityGeneratePrompt,
-    SecurityExplainPrompt,
-    SecurityInteractivePrompt
-)
+import httpx
+
+from src.core.cache import ResponseCache
+from src.core.ollama_client import OllamaClient, OllamaError, OllamaModelNotFoundError
+from src.core.scheduler import Priority, Scheduler, Ticket
+from src.core.singleflight import SingleFlight
+from src.core.stats import RequestStats
+from src.prompts.base import GeneratePrompt, ExplainPrompt, InteractivePrompt, PromptResult
 from src.config.settings import get_settings
 
 
@@ -28,6 +28,37 @@ class Persona(str, Enum):
     SECURITY = "security"
 
 
+# Module and class-name prefix of each persona's prompts; a persona's
+# module is only imported the first time it is used
+PERSONA_PROMPTS = {
+    Persona.GENERAL: ("src.prompts.personas.general", "General"),
+    Persona.SECURITY: ("src.prompts.personas.security", "Security"),
+}
+
+
+def load_prompts(persona: Persona) -> Tuple[GeneratePrompt, ExplainPrompt, InteractivePrompt]:
+    """Import a persona's prompt module and build its generate/explain/interactive prompts."""
+    module_name, prefix = PERSONA_PROMPTS[persona]
+    module = importlib.import_module(module_name)
+    return (
+        getattr(module, f"{prefix}GeneratePrompt")(),
+        getattr(module, f"{prefix}ExplainPrompt")(),
+        getattr(module, f"{prefix}InteractivePrompt")()
+    )
+
+
+@dataclass
+class ChatSession:
+    """One conversation: the Ollama token context carried between its turns."""
+    context: Optional[List[int]] = None
+    owner: Optional[Tuple[str, str]] = None  # (persona, model) that produced the context
+    
+    def reset(self):
+        """Forget the conversation so the next turn starts fresh."""
+        self.context = None
+        self.owner = None
+
+
 class CommandEngine:
     """
     Core engine for command generation and explanation.
@@ -39,15 +70,58 @@ class CommandEngine:
     def __init__(
         self,
         client: Optional[OllamaClient] = None,
-        persona: Optional[Persona] = None
+        persona: Optional[Persona] = None,
+        cache: Optional[ResponseCache] = None,
+        use_cache: bool = True,
+        scheduler: Optional[Scheduler] = None
     ):
         self.client = client or OllamaClient()
         settings = get_settings()
         self.persona = persona or Persona(settings.get_persona())
+        self._prompts: Dict[Persona, Tuple[GeneratePrompt, ExplainPrompt, InteractivePrompt]] = {}
+        
+        # Persistent response cache for generate/explain
+        if use_cache and (cache is not None or settings.cache.enabled):
+            self.cache = cache or ResponseCache()
+        else:
+            self.cache = None
         
         # Detect OS context
         self.os_context = self._detect_os()
-        self.shell = self._detect_shell()
+        self.shell = self.detect_shell()
+        
+        # Background model preload/keep-alive for long-lived sessions
+        self.keepalive_refresh = settings.ollama.keepalive_refresh
+        self.preload_time: Optional[float] = None
+        self._keepalive_task: Optional[asyncio.Task] = None
+        
+        # Background re-check of a stale model digest (see _cache_key)
+        self._digest_task: Optional[asyncio.Task] = None
+        
+        # Ollama token context carried between chat turns
+        self.max_context_tokens = settings.ollama.max_context_tokens
+        self.session = ChatSession()
+        
+        # Coalesces identical concurrent generate/explain requests
+        self.inflight = SingleFlight()
+        
+        # Admission by priority, capped at the backend's parallel slots
+        # and at what the hosts' adaptive limits currently allow; engines
+        # sharing a client should share this too
+        if scheduler is None:
+            scheduler = Scheduler(
+                settings.ollama.scheduler.slots,
+                preempt=settings.ollama.scheduler.preempt,
+                capacity=self.client.pool.capacity
+            )
+            # Admit waiters as soon as a host's limit grows
+            for host in self.client.pool.hosts:
+                if host.limiter is not None:
+                    host.limiter.listeners.append(scheduler.poke)
+        self.scheduler = scheduler
+        
+        # Statistics for the most recent engine call
+        self.last_stats: Optional[RequestStats] = None
     
     def _detect_os(self) -> str:
         """Detect the current operating system."""
@@ -59,9 +133,10 @@ class CommandEngine:
         else:
             return "Linux/Unix"
     
-    def _detect_shell(self) -> str:
-        """Detect the current shell."""
-        shell = os.environ.get("SHELL", "")
+    def detect_shell(self, shell: Optional[str] = None) -> str:
+        """Detect the current shell (or the one at ``shell``, a $SHELL value)."""
+        if shell is None:
+            shell = os.environ.get("SHELL", "")
         if "zsh" in shell:
             return "zsh"
         elif "fish" in shell:
@@ -70,29 +145,299 @@ class CommandEngine:
             return "PowerShell"
         return "bash"
     
-    def _get_prompts(self):
-        """Get the appropriate prompts for the current persona."""
-        if self.persona == Persona.SECURITY:
-            return (
-                SecurityGeneratePrompt(),
-                SecurityExplainPrompt(),
-                SecurityInteractivePrompt()
-            )
-        else:
-            return (
-                GeneralGeneratePrompt(),
-                GeneralExplainPrompt(),
-                GeneralInteractivePrompt()
-            )
+    def _get_prompts(self, persona: Optional[Persona] = None):
+        """Get the appropriate prompts for a persona (default: the current one)."""
+        persona = persona or self.persona
+        prompts = self._prompts.get(persona)
+        if prompts is None:
+            prompts = self._prompts[persona] = load_prompts(persona)
+        return prompts
     
     def set_persona(self, persona: Persona):
         """Switch to a different persona."""
+        if persona != self.persona:
+            self.reset_chat()
         self.persona = persona
     
+    def reset_chat(self):
+        """Forget the conversation so the next chat turn starts fresh."""
+        self.session.reset()
+    
+    def _chat_context_for_turn(self, session: ChatSession, persona: Persona) -> Optional[List[int]]:
+        """
+        Get the context to continue, or None to start a new conversation.
+        
+        The context is dropped when the persona or model changed since it
+        was produced, or when it has grown past max_context_tokens.
+        """
+        owner = (persona.value, self.client.model)
+        if session.owner is not None and session.owner != owner:
+            session.reset()
+        elif session.context and len(session.context) > self.max_context_tokens:
+            session.reset()
+        return session.context
+    
+    def _store_chat_context(self, session: ChatSession, persona: Persona, metadata: Dict[str, Any]):
+        """Remember the context returned by a finished chat turn."""
+        context = metadata.get("context")
+        if context:
+            session.context = context
+            session.owner = (persona.value, self.client.model)
+    
+    async def _track_chat_stream(
+        self,
+        generator: AsyncGenerator[str, None],
+        session: ChatSession,
+        persona: Persona,
+        metadata: Dict[str, Any]
+    ) -> AsyncGenerator[str, None]:
+        """Pass a chat stream through, keeping its context once it completes."""
+        async for chunk in generator:
+            yield chunk
+        self._store_chat_context(session, persona, metadata)
+    
+    def _new_stats(
+        self,
+        mode: str,
+        stats: Optional[RequestStats],
+        persona: Optional[Persona] = None
+    ) -> RequestStats:
+        """Start statistics for an engine call and make them the latest."""
+        stats = stats or RequestStats()
+        stats.mode = mode
+        stats.model = self.client.model
+        stats.persona = (persona or self.persona).value
+        self.last_stats = stats
+        return stats
+    
+    async def _measure_stream(
+        self,
+        generator: AsyncGenerator[str, None],
+        stats: RequestStats,
+        metadata: Dict[str, Any]
+    ) -> AsyncGenerator[str, None]:
+        """Pass a stream through, timing the first token and completion."""
+        try:
+            async for chunk in generator:
+                stats.mark_first_token()
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            # Keep the timings of a stream stopped part way through
+            stats.cancelled = True
+            raise
+        finally:
+            stats.finish(metadata)
+    
+    def _measure(
+        self,
+        result: str | AsyncGenerator[str, None],
+        stats: RequestStats,
+        metadata: Dict[str, Any],
+        stream: bool
+    ) -> str | AsyncGenerator[str, None]:
+        """Attach statistics collection to an engine result."""
+        if stream:
+            return self._measure_stream(result, stats, metadata)
+        stats.finish(metadata)
+        return result
+    
+    async def _cache_key(
+        self,
+        mode: str,
+        prompt_result: PromptResult,
+        persona: Optional[Persona] = None,
+        os_context: Optional[str] = None,
+        shell: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Build the cache key for a request.
+        
+        Returns None (bypassing the cache) when the model's digest can't be
+        resolved, so a missing model or dead host surfaces the usual error.
+        Only the first request for a model waits for its digest; once it
+        is older than ``cache.digest_ttl`` the known one keeps being used
+        while it is re-checked in the background, so a re-pulled model
+        changes the key from the next request on. Persona, OS and shell
+        default to the engine's own.
+        """
+        if self.cache is None:
+            return None
+        
+        model = self.client.model
+        digest, fresh = self.cache.get_digest(model)
+        if digest is None:
+            digest = await self._fetch_digest(model)
+            if digest is None:
+                return None
+        elif not fresh and self._digest_task is None:
+            self._digest_task = asyncio.create_task(self._refresh_digest(model))
+        
+        return ResponseCache.make_key(
+            model=model,
+            digest=digest,
+            persona=(persona or self.persona).value,
+            mode=mode,
+            os_context=os_context or self.os_context,
+            shell=shell or self.shell,
+            system=prompt_result.system,
+            user=prompt_result.user
+        )
+    
+    async def _fetch_digest(self, model: str) -> Optional[str]:
+        """Look up a model's digest and remember it in the cache."""
+        try:
+            digest = await self.client.model_digest(model)
+        except (OllamaError, httpx.HTTPError):
+            return None
+        if not digest:
+            return None
+        self.cache.put_digest(model, digest)
+        return digest
+    
+    async def _refresh_digest(self, model: str):
+        try:
+            await self._fetch_digest(model)
+        finally:
+            self._digest_task = None
+    
+    async def _replay(self, text: str) -> AsyncGenerator[str, None]:
+        """Serve a cached response through the streaming interface."""
+        yield text
+    
+    async def _record_stream(
+        self,
+        generator: AsyncGenerator[str, None],
+        key: str,
+        mode: str
+    ) -> AsyncGenerator[str, None]:
+        """Pass a stream through, caching it once it completes."""
+        chunks = []
+        async for chunk in generator:
+            chunks.append(chunk)
+            yield chunk
+        self.cache.put(key, "".join(chunks), self.client.model, mode)
+    
+    async def _collect(
+        self,
+        open_stream: Callable[[Ticket], Awaitable[AsyncGenerator[str, None]]],
+        ticket: Ticket,
+        metadata: Dict[str, Any]
+    ) -> str:
+        """Run a request to completion and return the whole response."""
+        chunks = []
+        async for chunk in await open_stream(ticket):
+            if not chunks:
+                metadata["first_token_at"] = time.perf_counter()
+            chunks.append(chunk)
+        return "".join(chunks)
+    
+    async def _scheduled(
+        self,
+        priority: Priority,
+        open_stream: Callable[[Ticket], Awaitable[AsyncGenerator[str, None]]],
+        metadata: Dict[str, Any]
+    ) -> AsyncGenerator[str, None]:
+        """
+        Run a request while holding a scheduler slot.
+        
+        Interactive requests stream straight through. Background requests
+        are collected before anything is yielded, so when an interactive
+        request preempts one it can be re-queued and started over without
+        the caller ever seeing partial output. Either way, when the first
+        token arrived from Ollama is recorded in ``metadata`` as
+        ``first_token_at``, for callers that only see the whole response.
+        """
+        if priority == Priority.INTERACTIVE:
+            ticket = await self.scheduler.acquire(priority)
+            try:
+                async for chunk in await open_stream(ticket):
+                    metadata.setdefault("first_token_at", time.perf_counter())
+                    yield chunk
+            finally:
+                self.scheduler.release(ticket)
+            return
+        
+        while True:
+            ticket = await self.scheduler.acquire(priority)
+            try:
+                work = asyncio.ensure_future(self._collect(open_stream, ticket, metadata))
+                ticket.work = work
+                try:
+                    await asyncio.wait({work})
+                except asyncio.CancelledError:
+                    work.cancel()
+                    await asyncio.wait({work})
+                    raise
+            finally:
+                self.scheduler.release(ticket)
+            if work.cancelled() and ticket.preempted:
+                continue
+            yield work.result()
+            return
+    
+    async def _generate_cached(
+        self,
+        mode: str,
+        prompt_result: PromptResult,
+        stream: bool,
+        stats: RequestStats,
+        metadata: Dict[str, Any],
+        persona: Optional[Persona] = None,
+        os_context: Optional[str] = None,
+        shell: Optional[str] = None,
+        priority: Priority = Priority.INTERACTIVE
+    ) -> str | AsyncGenerator[str, None]:
+        """Serve a request from the cache, or forward it and cache the result."""
+        key = await self._cache_key(mode, prompt_result, persona, os_context, shell)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                stats.cached = True
+                return self._replay(cached) if stream else cached
+        
+        async def start(flight_metadata: Dict[str, Any]) -> AsyncGenerator[str, None]:
+            async def open_stream(ticket: Ticket):
+                return await self.client.generate(
+                    prompt=prompt_result.user,
+                    system=prompt_result.system,
+                    stream=True,
+                    metadata=flight_metadata,
+                    ticket=ticket
+                )
+            
+            result = self._scheduled(priority, open_stream, flight_metadata)
+            return result if key is None else self._record_stream(result, key, mode)
+        
+        # Identical requests already in flight share one upstream generation.
+        # Priority is part of the key so interactive callers never wait on
+        # a background flight that may be preempted.
+        flight_key = ResponseCache.make_key(
+            model=self.client.model,
+            system=prompt_result.system,
+            user=prompt_result.user,
+            keep_alive=self.client.keep_alive,
+            priority=int(priority)
+        )
+        flight, leader = self.inflight.join(flight_key, start)
+        stats.coalesced = not leader
+        if stream:
+            return flight.subscribe(metadata)
+        try:
+            return await flight.result(metadata)
+        except asyncio.CancelledError:
+            stats.cancelled = True
+            stats.finish(metadata)
+            raise
+    
     async def generate(
         self,
         description: str,
-        stream: bool = False
+        stream: bool = False,
+        stats: Optional[RequestStats] = None,
+        persona: Optional[Persona] = None,
+        os_context: Optional[str] = None,
+        shell: Optional[str] = None,
+        priority: Priority = Priority.INTERACTIVE
     ) -> str | AsyncGenerator[str, None]:
         """
         Generate a terminal command from natural language.
@@ -100,28 +445,40 @@ class CommandEngine:
         Args:
             description: Natural language description of what the command should do
             stream: If True, return an async generator for streaming output
+            stats: Optional RequestStats to fill in (also kept as last_stats)
+            persona: Persona for this request only (default: the engine's)
+            os_context: Target OS for this request only (default: detected)
+            shell: Target shell for this request only (default: detected)
+            priority: Scheduling class; background work yields to INTERACTIVE
             
         Returns:
             The generated command string, or async generator if streaming
         """
-        generate_prompt, _, _ = self._get_prompts()
+        generate_prompt, _, _ = self._get_prompts(persona)
+        os_context = os_context or self.os_context
+        shell = shell or self.shell
         
         prompt_result = generate_prompt.format(
             description,
-            os_context=self.os_context,
-            shell=self.shell
+            os_context=os_context,
+            shell=shell
         )
         
-        return await self.client.generate(
-            prompt=prompt_result.user,
-            system=prompt_result.system,
-            stream=stream
+        stats = self._new_stats("generate", stats, persona)
+        metadata: Dict[str, Any] = {}
+        result = await self._generate_cached(
+            "generate", prompt_result, stream, stats, metadata, persona, os_context, shell,
+            priority
         )
+        return self._measure(result, stats, metadata, stream)
     
     async def explain(
         self,
         command: str,
-        stream: bool = False
+        stream: bool = False,
+        stats: Optional[RequestStats] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        persona: Optional[Persona] = None
     ) -> str | AsyncGenerator[str, None]:
         """
         Explain what a terminal command does.
@@ -129,36 +486,62 @@ class CommandEngine:
         Args:
             command: The command to explain
             stream: If True, return an async generator for streaming output
+            stats: Optional RequestStats to fill in (also kept as last_stats)
+            priority: Scheduling class; background work yields to INTERACTIVE
+            persona: Persona for this request only (default: the engine's)
             
         Returns:
             The explanation string, or async generator if streaming
         """
-        _, explain_prompt, _ = self._get_prompts()
+        _, explain_prompt, _ = self._get_prompts(persona)
         
         prompt_result = explain_prompt.format(command)
         
-        return await self.client.generate(
-            prompt=prompt_result.user,
-            system=prompt_result.system,
-            stream=stream
+        stats = self._new_stats("explain", stats, persona)
+        metadata: Dict[str, Any] = {}
+        result = await self._generate_cached(
+            "explain", prompt_result, stream, stats, metadata, persona, priority=priority
         )
+        return self._measure(result, stats, metadata, stream)
+    
+    async def explain_key(self, command: str, persona: Optional[Persona] = None) -> Optional[str]:
+        """
+        The cache key explain() would use for ``command``.
+        
+        Returns None when there is no cache or the model's digest can't
+        be resolved.
+        """
+        _, explain_prompt, _ = self._get_prompts(persona)
+        return await self._cache_key("explain", explain_prompt.format(command), persona)
     
     async def chat(
         self,
         message: str,
-        stream: bool = True
+        stream: bool = True,
+        stats: Optional[RequestStats] = None,
+        persona: Optional[Persona] = None,
+        session: Optional[ChatSession] = None
     ) -> str | AsyncGenerator[str, None]:
         """
         Interactive chat mode for general assistance.
         
+        Follow-up turns continue from the context Ollama returned for the
+        previous turn, so only the new message is prefilled; the system
+        prompt is sent only when a conversation starts.
+        
         Args:
             message: User's message/question
             stream: If True, return an async generator for streaming output
+            stats: Optional RequestStats to fill in (also kept as last_stats)
+            persona: Persona for this turn only (default: the engine's)
+            session: Conversation to continue (default: the engine's own)
             
         Returns:
             The response string, or async generator if streaming
         """
-        _, _, interactive_prompt = self._get_prompts()
+        persona = persona or self.persona
+        session = session or self.session
+        _, _, interactive_prompt = self._get_prompts(persona)
         
         prompt_result = interactive_prompt.format(
             message,
@@ -166,20 +549,108 @@ class CommandEngine:
             shell=self.shell
         )
         
-        return await self.client.generate(
-            prompt=prompt_result.user,
-            system=prompt_result.system,
-            stream=stream
-        )
+        stats = self._new_stats("chat", stats, persona)
+        context = self._chat_context_for_turn(session, persona)
+        metadata: Dict[str, Any] = {}
+        
+        async def open_stream(ticket: Ticket):
+            return await self.client.generate(
+                prompt=prompt_result.user,
+                system=None if context else prompt_result.system,
+                stream=True,
+                context=context,
+                metadata=metadata,
+                ticket=ticket
+            )
+        
+        result = self._scheduled(Priority.INTERACTIVE, open_stream, metadata)
+        if stream:
+            result = self._track_chat_stream(result, session, persona, metadata)
+        else:
+            result = "".join([chunk async for chunk in result])
+            self._store_chat_context(session, persona, metadata)
+        return self._measure(result, stats, metadata, stream)
     
     async def check_connection(self) -> bool:
         """Check if Ollama is accessible."""
         return await self.client.check_health()
     
+    async def diagnose(self, error: Exception) -> str:
+        """
+        Explain why a request failed, in user-facing terms.
+        
+        Requests are sent optimistically without a prior health check;
+        the version and model checks only run here, after a failure.
+        """
+        if isinstance(error, OllamaModelNotFoundError):
+            return str(error)
+        
+        # Don't trust health/model state cached before the failure
+        self.client.invalidate_state()
+        if not await self.check_connection():
+            return f"Cannot connect to Ollama at {self.client.host}. Is it running?"
+        
+        model = self.client.model
+        if not await self.client.model_exists(model):
+            return f"Model '{model}' not found. Run: ollama pull {model}"
+        
+        if isinstance(error, OllamaError):
+            return f"Ollama error: {error}"
+        return f"Ollama error: {error.__class__.__name__}: {error}"
+    
     async def list_models(self):
         """List available Ollama models."""
         return await self.client.list_models()
     
+    def start_keepalive(self):
+        """
+        Preload the model in the background and keep it resident.
+        
+        Intended for long-lived modes (REPL, batch); the model is loaded
+        before the first real request and re-pinged whenever the session
+        has been idle for keepalive_refresh seconds.
+        """
+        if self._keepalive_task is None:
+            self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+    
+    async def _keepalive_loop(self):
+        """Preload once, then refresh the model's keep_alive while idle."""
+        try:
+            self.preload_time = await self.client.preload()
+        except (OllamaError, httpx.HTTPError):
+            pass
+        
+        while True:
+            await asyncio.sleep(self.keepalive_refresh)
+            if self.client.idle_for() >= self.keepalive_refresh:
+                try:
+                    await self.client.preload()
+                except (OllamaError, httpx.HTTPError):
+                    pass
+    
+    async def stop_keepalive(self):
+        """Stop the background keep-alive task."""
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            try:
+                await self._keepalive_task
+            except asyncio.CancelledError:
+                pass
+            self._keepalive_task = None
+    
+    def connection_stats(self):
+        """Connection reuse counters for the engine's HTTP transport."""
+        return self.client.connection_stats
+    
     async def close(self):
         """Clean up resources."""
+        await self.stop_keepalive()
+        if self._digest_task is not None:
+            self._digest_task.cancel()
+            try:
+                await self._digest_task
+            except asyncio.CancelledError:
+                pass
         await self.client.close()
+        if self.cache is not None:
+            self.cache.close()
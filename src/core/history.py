@@ -0,0 +1,305 @@
+"""
+Shell history ingestion for Command Explainer.
+Reads bash/zsh history incrementally and precomputes explanations for
+frequently used commands so later explain calls are served from the cache.
+"""
+
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, List, Dict, Iterable, Iterator, Tuple
+
+from src.config.settings import get_settings
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history_files (
+    path TEXT PRIMARY KEY,
+    inode INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history_commands (
+    command TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    last_used REAL,
+    explained_at REAL,
+    explained_key TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_history_pending ON history_commands(explained_at, count);
+"""
+
+# zsh EXTENDED_HISTORY: ": <start>:<elapsed>;<command>"
+ZSH_EXTENDED = re.compile(rb"^: (\d+):\d+;")
+ZSH_EXTENDED_ANYWHERE = re.compile(rb"^: \d+:\d+;", re.MULTILINE)
+# bash with HISTTIMEFORMAT writes "#<epoch>" before each command
+BASH_TIMESTAMP = re.compile(rb"^#(\d+)$")
+
+# zsh stores bytes >= 0x83 as 0x83 followed by the byte xor 32
+ZSH_META = 0x83
+
+
+def default_history_files() -> List[Path]:
+    """History files from settings, or the usual bash/zsh locations."""
+    settings = get_settings()
+    if settings.history.files:
+        return [Path(p).expanduser() for p in settings.history.files]
+    candidates = []
+    histfile = os.environ.get("HISTFILE")
+    if histfile:
+        candidates.append(Path(histfile).expanduser())
+    candidates += [Path("~/.bash_history").expanduser(), Path("~/.zsh_history").expanduser()]
+    
+    files = []
+    for path in candidates:
+        if path.is_file() and path not in files:
+            files.append(path)
+    return files
+
+
+def is_zsh_history(path: Path, data: bytes) -> bool:
+    """
+    Whether a history file was written by zsh.
+
+    Going by the file name, or by the extended format in its contents;
+    a zsh history without either is read as bash, which only loses the
+    unmetafying of non-ASCII text and the joining of multi-line entries.
+    """
+    return "zsh" in path.name or ZSH_EXTENDED_ANYWHERE.search(data) is not None
+
+
+def unmetafy(data: bytes) -> bytes:
+    """Undo zsh's metafication of non-ASCII bytes."""
+    if ZSH_META not in data:
+        return data
+    out = bytearray()
+    it = iter(data)
+    for byte in it:
+        if byte == ZSH_META:
+            byte = next(it, 0) ^ 32
+        out.append(byte)
+    return bytes(out)
+
+
+def normalize_command(command: str) -> Optional[str]:
+    """
+    Clean up a history entry, or return None if it isn't worth explaining.
+
+    Only surrounding whitespace is stripped, so the text matches what a
+    user would paste into ``cmdex explain`` and hits the same cache key.
+    """
+    command = command.strip()
+    if not command or command.startswith("#"):
+        return None
+    first = command.split(None, 1)[0]
+    if first in get_settings().history.ignore:
+        return None
+    return command
+
+
+def parse_history(data: bytes, zsh: bool = False) -> Tuple[List[Tuple[str, Optional[float]]], int]:
+    """
+    Parse a block of bash history, or zsh history with ``zsh``.
+
+    Returns (command, timestamp) pairs and the number of bytes consumed.
+    Only complete entries are consumed: a trailing partial line, or a
+    multi-line zsh entry whose continuation hasn't been written yet, is
+    left for the next run. Metafied bytes and trailing backslashes are
+    zsh encodings, so bash history is decoded as written.
+    """
+    entries = []
+    consumed = 0
+    position = 0
+    pending: List[bytes] = []
+    timestamp: Optional[float] = None
+    
+    while True:
+        newline = data.find(b"\n", position)
+        if newline < 0:
+            break
+        line = data[position:newline]
+        position = newline + 1
+        
+        if not pending and zsh:
+            match = ZSH_EXTENDED.match(line)
+            if match:
+                timestamp = float(match.group(1))
+                line = line[match.end():]
+        elif not pending:
+            match = BASH_TIMESTAMP.match(line)
+            if match:
+                timestamp = float(match.group(1))
+                consumed = position
+                continue
+        
+        if zsh and line.endswith(b"\\"):
+            # Multi-line entry: zsh keeps the backslash before each newline
+            pending.append(line[:-1])
+            continue
+        
+        pending.append(line)
+        raw = b"\n".join(pending)
+        if zsh:
+            raw = unmetafy(raw)
+        entries.append((raw.decode("utf-8", errors="replace"), timestamp))
+        pending = []
+        timestamp = None
+        consumed = position
+    
+    return entries, consumed
+
+
+@dataclass
+class IngestResult:
+    """What one ingest run read from the history files."""
+    files: Dict[str, int] = field(default_factory=dict)  # path -> new bytes read
+    lines: int = 0
+    commands: int = 0  # distinct normalized commands in the new lines
+    new_commands: int = 0  # commands never seen before
+
+
+class HistoryIndex:
+    """
+    SQLite index of shell history.
+
+    Remembers how far each history file has been read (by inode and
+    byte offset) and how often each command has been used, so re-running
+    an ingest only reads what was appended and explains the most
+    frequent commands first.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        settings = get_settings()
+        self.path = Path(path or settings.history.path).expanduser()
+        self._conn: Optional[sqlite3.Connection] = None
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use."""
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(history_commands)")]
+            if "explained_key" not in columns:
+                # Indexes written before explanations were tied to a cache key
+                conn.execute("ALTER TABLE history_commands ADD COLUMN explained_key TEXT")
+            self._conn = conn
+        return self._conn
+    
+    def _read_new(self, path: Path) -> Tuple[bytes, int, int]:
+        """Return unread bytes, the file's inode and the offset they start at."""
+        conn = self._connect()
+        stat = path.stat()
+        row = conn.execute(
+            "SELECT inode, offset FROM history_files WHERE path = ?", (str(path),)
+        ).fetchone()
+        offset = 0
+        if row is not None and row[0] == stat.st_ino and row[1] <= stat.st_size:
+            offset = row[1]
+        # Otherwise the file was replaced or truncated: read it again from the start
+        
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        return data, stat.st_ino, offset
+    
+    def ingest(self, paths: Iterable[Path]) -> IngestResult:
+        """Read history appended since the last run and update frequencies."""
+        conn = self._connect()
+        result = IngestResult()
+        counts: Dict[str, int] = {}
+        last_used: Dict[str, Optional[float]] = {}
+        
+        offsets = []
+        for path in paths:
+            try:
+                data, inode, offset = self._read_new(path)
+            except OSError:
+                continue
+            entries, consumed = parse_history(data, zsh=is_zsh_history(path, data))
+            result.files[str(path)] = consumed
+            offsets.append((str(path), inode, offset + consumed))
+            
+            for command, timestamp in entries:
+                result.lines += 1
+                command = normalize_command(command)
+                if command is None:
+                    continue
+                counts[command] = counts.get(command, 0) + 1
+                if timestamp is not None:
+                    last_used[command] = max(timestamp, last_used.get(command) or 0)
+        
+        now = time.time()
+        conn.execute("BEGIN")
+        try:
+            for command, count in counts.items():
+                existing = conn.execute(
+                    "SELECT 1 FROM history_commands WHERE command = ?", (command,)
+                ).fetchone()
+                if existing is None:
+                    result.new_commands += 1
+                conn.execute(
+                    "INSERT INTO history_commands (command, count, last_used) VALUES (?, ?, ?) "
+                    "ON CONFLICT(command) DO UPDATE SET count = count + excluded.count, "
+                    "last_used = COALESCE(MAX(last_used, excluded.last_used), "
+                    "last_used, excluded.last_used)",
+                    (command, count, last_used.get(command, now))
+                )
+            for path, inode, offset in offsets:
+                conn.execute(
+                    "INSERT OR REPLACE INTO history_files (path, inode, offset, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (path, inode, offset, now)
+                )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        
+        result.commands = len(counts)
+        return result
+    
+    def ranked(self) -> Iterator[str]:
+        """Every command, most frequent first."""
+        cursor = self._connect().execute(
+            "SELECT command FROM history_commands ORDER BY count DESC, last_used DESC"
+        )
+        for row in cursor:
+            yield row[0]
+    
+    def mark_explained(self, command: str, key: str):
+        """Record that a command's explanation is in the response cache under ``key``."""
+        self._connect().execute(
+            "UPDATE history_commands SET explained_at = ?, explained_key = ? WHERE command = ?",
+            (time.time(), key, command)
+        )
+    
+    def top(self, limit: int) -> List[Tuple[str, int, Optional[str]]]:
+        """
+        Most frequently used commands as (command, count, explained key).
+
+        The key is the response cache entry the last explanation went
+        into; the entry may since have been evicted.
+        """
+        rows = self._connect().execute(
+            "SELECT command, count, explained_key FROM history_commands "
+            "ORDER BY count DESC, last_used DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [(row[0], row[1], row[2]) for row in rows]
+    
+    def reset(self):
+        """Forget all offsets and counts so the next ingest starts over."""
+        conn = self._connect()
+        conn.execute("DELETE FROM history_files")
+        conn.execute("DELETE FROM history_commands")
+    
+    def close(self):
+        """Close the database connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,178 @@
+"""
+Multi-host routing for the Ollama client.
+Balances requests across Ollama endpoints by weighted outstanding requests.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Set, Iterable
+
+import httpx
+
+from src.config.settings import HostSettings, LimiterSettings, PoolSettings, TransportSettings
+from src.core.limiter import AdaptiveLimiter
+from src.core.transport import ConnectionStats, build_http_client
+
+
+def normalize_model(name: str) -> str:
+    """Give a model name an explicit tag, as Ollama reports it in /api/tags."""
+    return name if ":" in name else f"{name}:latest"
+
+
+@dataclass
+class OllamaHost:
+    """Routing state for a single Ollama endpoint."""
+    url: str
+    weight: float = 1.0
+    inflight: int = 0
+    failures: int = 0
+    ejected_until: float = 0.0
+    models: Optional[Set[str]] = None
+    models_fetched_at: float = 0.0
+    client: Optional[httpx.AsyncClient] = field(default=None, repr=False)
+    limiter: Optional[AdaptiveLimiter] = field(default=None, repr=False)
+    
+    @property
+    def healthy(self) -> bool:
+        """False while the host is ejected after repeated failures."""
+        return time.monotonic() >= self.ejected_until
+    
+    @property
+    def load(self) -> float:
+        """Outstanding requests relative to the host's weight."""
+        return self.inflight / self.weight
+    
+    @property
+    def saturated(self) -> bool:
+        """Whether the host is at its adaptive concurrency limit."""
+        return self.limiter is not None and not self.limiter.available
+    
+    def has_model(self, model: str) -> bool:
+        """Whether the host has the model, assuming yes until /api/tags says otherwise."""
+        return self.models is None or normalize_model(model) in self.models
+
+
+class HostPool:
+    """
+    A set of Ollama endpoints with least-outstanding-requests selection.
+    
+    Each host gets its own pooled HTTP client (sharing one set of
+    connection counters). Hosts are ejected for ``eject_seconds`` after
+    ``eject_after`` consecutive failures and reinstated automatically
+    once the window passes; a success resets the failure count. With
+    ``limiter`` settings, each host also gets an adaptive concurrency
+    limit, and hosts below their limit are preferred.
+    """
+    
+    def __init__(
+        self,
+        hosts: List[HostSettings],
+        settings: PoolSettings,
+        timeout: int,
+        stats: ConnectionStats,
+        transport: Optional[TransportSettings] = None,
+        limiter: Optional[LimiterSettings] = None
+    ):
+        self.hosts = [OllamaHost(url=h.url.rstrip("/"), weight=max(h.weight, 0.01)) for h in hosts]
+        if limiter is not None and limiter.enabled:
+            for host in self.hosts:
+                host.limiter = AdaptiveLimiter(
+                    initial=limiter.initial,
+                    minimum=limiter.min,
+                    maximum=limiter.max,
+                    tolerance=limiter.tolerance,
+                    backoff=limiter.backoff
+                )
+        self.settings = settings
+        self.timeout = timeout
+        self.stats = stats
+        self.transport = transport
+    
+    @property
+    def primary(self) -> OllamaHost:
+        """The first configured host."""
+        return self.hosts[0]
+    
+    @property
+    def multi(self) -> bool:
+        """Whether there is more than one host to choose from."""
+        return len(self.hosts) > 1
+    
+    def capacity(self) -> Optional[int]:
+        """Requests the hosts' adaptive limits allow in flight, or None if unlimited."""
+        if any(h.limiter is None for h in self.hosts):
+            return None
+        return sum(h.limiter.capacity for h in self.hosts)
+    
+    def client(self, host: OllamaHost) -> httpx.AsyncClient:
+        """Get (or lazily build) the HTTP client for a host."""
+        if host.client is None:
+            host.client = build_http_client(host.url, self.timeout, self.stats, self.transport)
+        return host.client
+    
+    def models_stale(self, host: OllamaHost) -> bool:
+        """Whether a host's model list should be re-fetched."""
+        return (
+            host.models is None
+            or time.monotonic() - host.models_fetched_at > self.settings.models_ttl
+        )
+    
+    def set_models(self, host: OllamaHost, names: Iterable[str]):
+        """Record the models a host reported via /api/tags."""
+        host.models = {normalize_model(n) for n in names}
+        host.models_fetched_at = time.monotonic()
+    
+    def select(self, model: str, exclude: Iterable[OllamaHost] = ()) -> Optional[OllamaHost]:
+        """
+        Pick the least loaded healthy host that has the model.
+        
+        Falls back to ejected hosts (earliest reinstatement first) when no
+        healthy host qualifies. Returns None only when every host is excluded.
+        """
+        excluded = set(id(h) for h in exclude)
+        candidates = [h for h in self.hosts if id(h) not in excluded]
+        if not candidates:
+            return None
+        
+        with_model = [h for h in candidates if h.has_model(model)] or candidates
+        healthy = [h for h in with_model if h.healthy]
+        if healthy:
+            return min(healthy, key=lambda h: (h.saturated, h.load, -h.weight))
+        return min(with_model, key=lambda h: h.ejected_until)
+    
+    def hosts_with(self, model: str) -> List[OllamaHost]:
+        """Healthy hosts that (as far as we know) have the model."""
+        return [h for h in self.hosts if h.healthy and h.has_model(model)] or [self.primary]
+    
+    def mark_success(self, host: OllamaHost):
+        """Reset a host's failure count."""
+        host.failures = 0
+        host.ejected_until = 0.0
+    
+    def mark_failure(self, host: OllamaHost):
+        """Count a failure, ejecting the host once it fails repeatedly."""
+        host.failures += 1
+        if host.failures >= self.settings.eject_after:
+            host.ejected_until = time.monotonic() + self.settings.eject_seconds
+    
+    def status(self) -> List[Dict[str, object]]:
+        """Per-host routing state, for display."""
+        return [
+            {
+                "url": h.url,
+                "weight": h.weight,
+                "inflight": h.inflight,
+                "failures": h.failures,
+                "healthy": h.healthy,
+                "limit": h.limiter.limit if h.limiter is not None else None,
+                "models": sorted(h.models) if h.models is not None else None,
+            }
+            for h in self.hosts
+        ]
+    
+    async def close(self):
+        """Close every host's HTTP client."""
+        for host in self.hosts:
+            if host.client is not None:
+                await host.client.aclose()
+                host.client = None
@@ -0,0 +1,186 @@
+"""
+Structured job runner for Command Explainer.
+Runs each unit of work (a REPL request, a batch, a one-shot command) as a
+cancellable job, so Ctrl-C stops the work in progress instead of the process.
+"""
+
+import asyncio
+import itertools
+import signal
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Optional, Dict, List, TypeVar
+
+
+T = TypeVar("T")
+
+_current_job: ContextVar[Optional["Job"]] = ContextVar("cmdex_job", default=None)
+_current_runner: ContextVar[Optional["JobRunner"]] = ContextVar("cmdex_runner", default=None)
+
+
+def current_job() -> Optional["Job"]:
+    """The job the calling code runs in, if any."""
+    return _current_job.get()
+
+
+def current_runner() -> Optional["JobRunner"]:
+    """The runner the calling code runs under, if any."""
+    return _current_runner.get()
+
+
+class JobCancelled(Exception):
+    """A job was cancelled (by Ctrl-C or its runner) before it finished."""
+    
+    def __init__(self, job: "Job"):
+        super().__init__(f"{job.name} cancelled")
+        self.job = job
+
+
+@dataclass(eq=False)
+class Job:
+    """One unit of work run by a JobRunner."""
+    id: int
+    name: str
+    foreground: bool
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+    
+    @property
+    def status(self) -> str:
+        """One of running, done, failed or cancelled."""
+        if self.task is None or not self.task.done():
+            return "running"
+        if self.task.cancelled():
+            return "cancelled"
+        return "failed" if self.task.exception() is not None else "done"
+    
+    def cancel(self):
+        """Request cancellation; the job's finally blocks still run."""
+        if self.task is not None:
+            self.task.cancel()
+
+
+class JobRunner:
+    """
+    Runs jobs as child tasks with structured cancellation.
+
+    Used as an async context manager around an entry point: leaving it
+    cancels every job still running and waits for them to unwind, so no
+    request outlives the command that started it. Cancelling a job raises
+    CancelledError at whatever it is awaiting; streams exit their
+    ``async with`` blocks on the way out, which closes the HTTP response
+    and lets Ollama free the slot, and request statistics are finished
+    (flagged as cancelled) with what was received.
+
+    With signal handlers installed, Ctrl-C cancels the most recently
+    started foreground job (the request the user is waiting on) rather
+    than raising KeyboardInterrupt; with no foreground job running, it
+    cancels the entry point itself.
+    """
+    
+    def __init__(self):
+        self.jobs: Dict[int, Job] = {}
+        self._ids = itertools.count(1)
+        self._main: Optional[asyncio.Task] = None
+        self._token = None
+        self._signals = False
+        self.interrupts = 0
+    
+    async def __aenter__(self) -> "JobRunner":
+        self._main = asyncio.current_task()
+        self._token = _current_runner.set(self)
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        try:
+            await self.shutdown()
+        finally:
+            self.remove_signal_handlers()
+            _current_runner.reset(self._token)
+    
+    def start(self, coro: Awaitable[T], name: str, foreground: bool = False) -> Job:
+        """Start ``coro`` as a job and return it without waiting."""
+        job = Job(id=next(self._ids), name=name, foreground=foreground)
+        job.task = asyncio.ensure_future(self._run(job, coro))
+        self.jobs[job.id] = job
+        job.task.add_done_callback(lambda _: self._finished(job))
+        return job
+    
+    async def _run(self, job: Job, coro: Awaitable[T]) -> T:
+        # Runs inside the job's own task, so the context is the job's alone
+        _current_job.set(job)
+        return await coro
+    
+    def _finished(self, job: Job):
+        job.finished = time.monotonic()
+        self.jobs.pop(job.id, None)
+    
+    async def run(self, coro: Awaitable[T], name: str, foreground: bool = True) -> T:
+        """
+        Run ``coro`` as a job and wait for its result.
+
+        Raises:
+            JobCancelled: If the job was cancelled while the caller was not
+        """
+        job = self.start(coro, name, foreground)
+        try:
+            await asyncio.wait({job.task})
+        except asyncio.CancelledError:
+            # The caller itself was cancelled: take the job down with it
+            job.cancel()
+            await asyncio.wait({job.task})
+            raise
+        if job.task.cancelled():
+            raise JobCancelled(job)
+        return job.task.result()
+    
+    @property
+    def foreground(self) -> Optional[Job]:
+        """The newest running foreground job."""
+        running = [j for j in self.jobs.values() if j.foreground and not j.task.done()]
+        return running[-1] if running else None
+    
+    def interrupt(self):
+        """Handle Ctrl-C: cancel the foreground job, or the entry point."""
+        self.interrupts += 1
+        job = self.foreground
+        if job is not None:
+            job.cancel()
+        elif self._main is not None:
+            self._main.cancel()
+    
+    async def shutdown(self):
+        """Cancel every running job and wait for all of them to finish."""
+        jobs = list(self.jobs.values())
+        for job in jobs:
+            job.cancel()
+        if jobs:
+            await asyncio.wait({job.task for job in jobs})
+    
+    def install_signal_handlers(self):
+        """Route SIGINT to interrupt() (POSIX only; elsewhere Ctrl-C is unchanged)."""
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGINT, self.interrupt)
+        except (NotImplementedError, RuntimeError):
+            return
+        self._signals = True
+    
+    def remove_signal_handlers(self):
+        if self._signals:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGINT)
+            self._signals = False
+    
+    def status(self) -> List[Dict[str, Any]]:
+        """Running jobs, for display."""
+        now = time.monotonic()
+        return [
+            {
+                "id": job.id,
+                "name": job.name,
+                "foreground": job.foreground,
+                "elapsed": now - job.started,
+            }
+            for job in self.jobs.values()
+        ]
@@ -0,0 +1,164 @@
+"""
+Checkpoint journals for resumable batch jobs.
+Records every finished batch item in an append-only file so an
+interrupted job can be resumed without redoing completed work.
+"""
+
+import hashlib
+import json
+import os
+import secrets
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Dict, Any, Tuple
+
+from src.config.settings import get_settings
+from src.core.batch import BatchResult
+
+
+class JournalError(Exception):
+    """A job journal is unreadable or belongs to a different kind of job."""
+    pass
+
+
+# Fields every item line carries
+ENTRY_KEYS = {"id", "ok", "attempts", "record"}
+
+
+def new_job_id() -> str:
+    """A sortable, unique job id."""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(2)}"
+
+
+class JobJournal:
+    """
+    Append-only JSONL checkpoint for one batch job.
+
+    The first line describes the job; each following line records one
+    finished item (its id, attempt count and output record). Items are
+    identified by input position and a hash of the input line, so a
+    resumed job only reuses results for inputs that haven't changed.
+    Later lines for the same item supersede earlier ones.
+    """
+    
+    def __init__(self, job_id: str, mode: str, directory: Optional[str] = None):
+        settings = get_settings()
+        self.job_id = job_id
+        self.mode = mode
+        self.directory = Path(directory or settings.batch.jobs_dir).expanduser()
+        self.path = self.directory / f"{job_id}.jsonl"
+        self.max_attempts = settings.batch.max_attempts
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.resumed = False
+        self._file = None
+    
+    @classmethod
+    def open(cls, job_id: Optional[str], mode: str) -> "JobJournal":
+        """
+        Resume the journal for ``job_id``, or start a new job.
+
+        Raises:
+            JournalError: If the job exists but its journal has no readable
+                header or it was started by a different mode
+        """
+        journal = cls(job_id or new_job_id(), mode)
+        journal.directory.mkdir(parents=True, exist_ok=True)
+        if job_id is None:
+            journal._prune()
+        if journal.path.exists():
+            journal._load()
+        journal._file = open(journal.path, "a", encoding="utf-8")
+        if not journal.resumed:
+            journal._append({"job": journal.job_id, "mode": mode, "created": time.time()})
+        return journal
+    
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for number, line in enumerate(f):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    entry = None
+                if number == 0:
+                    if not isinstance(entry, dict):
+                        raise JournalError(f"Job {self.job_id} has an unreadable journal ({self.path})")
+                    if entry.get("mode") != self.mode:
+                        raise JournalError(
+                            f"Job {self.job_id} was started by 'cmdex {entry.get('mode')}', "
+                            f"not 'cmdex {self.mode}'"
+                        )
+                    continue
+                if not isinstance(entry, dict) or not ENTRY_KEYS <= entry.keys():
+                    # A torn final line from a crash mid-write
+                    continue
+                self.entries[entry["id"]] = entry
+        self.resumed = True
+    
+    def _prune(self):
+        """Delete journals of jobs older than batch.keep_days."""
+        cutoff = time.time() - get_settings().batch.keep_days * 86400
+        for path in self.directory.glob("*.jsonl"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
+    
+    def _append(self, entry: Dict[str, Any]):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+    
+    @staticmethod
+    def item_id(index: int, line: str) -> str:
+        """Identify an input item by position and content."""
+        return f"{index}:{hashlib.sha1(line.encode('utf-8')).hexdigest()[:12]}"
+    
+    def finished(self, item_id: str) -> Optional[BatchResult]:
+        """
+        The recorded result for an item that needs no more work.
+
+        That is a success, a failure that would only happen again (such
+        as an invalid input record), or a failure that has used up its
+        attempts; anything else returns None and should be (re)run.
+        """
+        entry = self.entries.get(item_id)
+        if entry is None:
+            return None
+        if entry["ok"] or not entry.get("retry", True) or entry["attempts"] >= self.max_attempts:
+            return BatchResult.from_dict(entry["record"], resumed=True)
+        return None
+    
+    def record(self, item_id: str, result: BatchResult):
+        """Checkpoint a finished item."""
+        previous = self.entries.get(item_id)
+        entry = {
+            "id": item_id,
+            "ok": result.ok,
+            "attempts": (previous["attempts"] if previous else 0) + 1,
+            "retry": result.retry,
+            "record": result.to_dict(),
+        }
+        self.entries[item_id] = entry
+        self._append(entry)
+    
+    def wrap(
+        self,
+        worker: Callable[[Tuple[int, str]], Awaitable[BatchResult]]
+    ) -> Callable[[Tuple[int, str]], Awaitable[BatchResult]]:
+        """Make a batch worker skip checkpointed items and checkpoint new ones."""
+        async def run(item: Tuple[int, str]) -> BatchResult:
+            item_id = self.item_id(*item)
+            result = self.finished(item_id)
+            if result is not None:
+                return result
+            result = await worker(item)
+            self.record(item_id, result)
+            return result
+        return run
+    
+    def close(self):
+        """Close the journal file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
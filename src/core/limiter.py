@@ -0,0 +1,171 @@
+"""
+Adaptive concurrency limiting for Ollama hosts.
+Finds how many parallel requests a host can take from observed latency.
+"""
+
+import asyncio
+import heapq
+import itertools
+from typing import Callable, Optional, List, Dict, Any
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for one host, driven by latency.
+
+    Each finished request reports its time to first token and time per
+    output token. Both are compared against a baseline: the best latency
+    seen, re-anchored by requests that ran alone so a slower model or host
+    isn't mistaken for overload, but never raised by loaded samples.
+    While neither has inflated beyond ``tolerance`` times its baseline
+    and the limit is actually being used, the limit grows by about one
+    per window of requests; when latency inflates, or the host errors,
+    it is cut by ``backoff``. A CPU-only host that slows down past two
+    parallel requests settles near two, while a large GPU box keeps
+    growing toward ``maximum``. Requests waiting for room are admitted
+    by priority (lower first), then arrival order.
+    """
+    
+    # Weight of a new sample in the recent-latency average
+    SMOOTHING = 0.3
+    # How quickly requests that ran alone move the baseline
+    BASELINE_DRIFT = 0.1
+    
+    def __init__(
+        self,
+        initial: float = 2.0,
+        minimum: int = 1,
+        maximum: int = 16,
+        tolerance: float = 1.5,
+        backoff: float = 0.7
+    ):
+        self.minimum = max(minimum, 1)
+        self.maximum = max(maximum, self.minimum)
+        self.limit = min(max(float(initial), self.minimum), self.maximum)
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.inflight = 0
+        self.baseline: Dict[str, Optional[float]] = {"ttft": None, "tpot": None}
+        self.recent: Dict[str, Optional[float]] = {"ttft": None, "tpot": None}
+        self._since_decrease = self.maximum
+        self._waiters: List[tuple] = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        # Called whenever capacity grows, e.g. Scheduler.poke
+        self.listeners: List[Callable[[], None]] = []
+    
+    @property
+    def capacity(self) -> int:
+        """Requests allowed in flight right now."""
+        return max(int(self.limit), self.minimum)
+    
+    @property
+    def available(self) -> bool:
+        """Whether another request may start without waiting."""
+        return self.inflight < self.capacity
+    
+    @property
+    def waiting(self) -> int:
+        """Requests queued for room under the limit."""
+        return sum(1 for entry in self._waiters if not entry[2].done())
+    
+    async def acquire(self, priority: int = 0):
+        """
+        Wait until the host is below its limit. Must be paired with release().
+        
+        ``priority`` is a scheduler Priority; more urgent requests are
+        admitted ahead of less urgent ones already waiting.
+        """
+        if self.available and not self.waiting:
+            self.inflight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as we were cancelled: give the slot back
+                self.release()
+            raise
+    
+    def release(
+        self,
+        ttft: Optional[float] = None,
+        tpot: Optional[float] = None,
+        failed: bool = False
+    ):
+        """
+        Finish a request, updating the limit from how it went.
+
+        ``ttft`` and ``tpot`` are in seconds; pass neither for requests
+        that were abandoned rather than completed.
+        """
+        capacity = self.capacity
+        saturated = self.inflight >= capacity
+        alone = self.inflight <= 1
+        self.inflight = max(self.inflight - 1, 0)
+        if failed or ttft is not None or tpot is not None:
+            self._since_decrease += 1
+        if failed:
+            self._decrease()
+        elif ttft is not None or tpot is not None:
+            self._observe(ttft, tpot, saturated, alone)
+        self._wake()
+        if self.capacity > capacity:
+            for listener in self.listeners:
+                listener()
+    
+    def _wake(self):
+        while self._waiters and self.available:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self.inflight += 1
+            future.set_result(None)
+    
+    def _observe(
+        self,
+        ttft: Optional[float],
+        tpot: Optional[float],
+        saturated: bool,
+        alone: bool
+    ):
+        inflated = False
+        for name, sample in (("ttft", ttft), ("tpot", tpot)):
+            if not sample:
+                continue
+            baseline = self.baseline[name]
+            if baseline is None or sample < baseline:
+                self.baseline[name] = sample
+            elif alone:
+                self.baseline[name] = baseline + (sample - baseline) * self.BASELINE_DRIFT
+            recent = self.recent[name]
+            recent = sample if recent is None else recent + (sample - recent) * self.SMOOTHING
+            self.recent[name] = recent
+            if recent > self.baseline[name] * self.tolerance:
+                inflated = True
+        
+        if inflated:
+            self._decrease()
+        elif saturated:
+            self.limit = min(self.limit + 1.0 / self.limit, float(self.maximum))
+    
+    def _decrease(self):
+        # Requests started before the last cut still report the old latency;
+        # wait for a window of fresh samples before cutting again
+        if self._since_decrease < self.capacity:
+            return
+        self.limit = max(self.limit * self.backoff, float(self.minimum))
+        self._since_decrease = 0
+        for name in self.recent:
+            self.recent[name] = None
+    
+    def status(self) -> Dict[str, Any]:
+        """Current limit and latency estimates, for display."""
+        return {
+            "limit": round(self.limit, 2),
+            "inflight": self.inflight,
+            "waiting": self.waiting,
+            "baseline_ttft": self.baseline["ttft"],
+            "baseline_tpot": self.baseline["tpot"],
+        }
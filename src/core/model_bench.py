@@ -0,0 +1,277 @@
+"""
+Comparative model benchmark for Command Explainer.
+Runs a bundled corpus of generate/explain cases against Ollama models and
+scores speed (TTFT, prefill/decode throughput, load time) and correctness.
+"""
+
+import re
+import shlex
+import shutil
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional, List, Dict, Any
+
+import httpx
+
+from src.core.ollama_client import OllamaClient, OllamaError
+from src.core.stats import RequestStats
+from src.prompts.personas.general import GeneralGeneratePrompt, GeneralExplainPrompt
+
+
+# Cases are formatted for a fixed context so results compare across machines
+BENCH_OS = "Linux/Unix"
+BENCH_SHELL = "bash"
+
+# Words that may precede the real executable in a generated command
+COMMAND_PREFIXES = {"sudo", "env", "time", "nohup", "command"}
+
+
+@dataclass
+class BenchCase:
+    """One benchmark prompt and the checks its answer must pass."""
+    name: str
+    mode: str  # "generate" or "explain"
+    input: str
+    executable: Optional[str] = None  # generate: expected program
+    flags: List[str] = field(default_factory=list)  # generate: options that must appear
+    terms: List[str] = field(default_factory=list)  # explain: words the answer must mention
+
+
+CORPUS: List[BenchCase] = [
+    BenchCase("find-large-files", "generate", "find files larger than 100MB under /var",
+              executable="find", flags=["-size"]),
+    BenchCase("disk-usage", "generate", "show disk usage of each mounted filesystem in human readable units",
+              executable="df", flags=["-h"]),
+    BenchCase("grep-recursive", "generate", "search recursively for the word TODO in the current directory",
+              executable="grep", flags=["-r"]),
+    BenchCase("tar-extract", "generate", "extract the gzip compressed archive backup.tar.gz",
+              executable="tar", flags=["-x"]),
+    BenchCase("listening-ports", "generate", "list all listening TCP ports with the owning process",
+              executable="ss", flags=["-l", "-t"]),
+    BenchCase("git-last-commits", "generate", "show the last 5 git commits, one line each",
+              executable="git", flags=["log"]),
+    BenchCase("process-memory", "generate", "list the 10 processes using the most memory",
+              executable="ps"),
+    BenchCase("chmod-exec", "generate", "make the file deploy.sh executable",
+              executable="chmod", flags=["+x"]),
+    BenchCase("explain-tar", "explain", "tar -czvf logs.tar.gz /var/log",
+              terms=["compress", "archive", "verbose"]),
+    BenchCase("explain-find-exec", "explain", "find . -name '*.tmp' -mtime +7 -exec rm {} \\;",
+              terms=["delete", "7", "days"]),
+    BenchCase("explain-ps-sort", "explain", "ps aux --sort=-%mem | head -n 5",
+              terms=["memory", "process"]),
+    BenchCase("explain-rsync", "explain", "rsync -avz --delete src/ backup:/srv/src/",
+              terms=["archive", "compress", "delete"]),
+]
+
+
+def extract_command(text: str) -> str:
+    """Pull the command out of a generate answer (first line, code fences stripped)."""
+    fenced = re.search(r"```[a-zA-Z]*\n(.*?)```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1)
+    for line in text.splitlines():
+        line = line.strip().strip("`").strip()
+        if line.startswith("$ "):
+            line = line[2:]
+        if line:
+            return line
+    return ""
+
+
+def command_executable(command: str) -> Optional[str]:
+    """The program a command runs, skipping sudo/env-style prefixes and assignments."""
+    try:
+        words = shlex.split(command)
+    except ValueError:
+        words = command.split()
+    for word in words:
+        if word in COMMAND_PREFIXES or re.match(r"^[A-Za-z_][A-Za-z0-9_]*=", word):
+            continue
+        return word
+    return None
+
+
+def check_case(case: BenchCase, output: str) -> Dict[str, bool]:
+    """Run a case's correctness checks against a model's answer."""
+    checks: Dict[str, bool] = {}
+    if case.mode == "generate":
+        command = extract_command(output)
+        executable = command_executable(command)
+        checks["executable_exists"] = bool(executable) and shutil.which(executable) is not None
+        if case.executable:
+            checks["expected_executable"] = executable == case.executable
+        words = command.split()
+        for flag in case.flags:
+            # "-l" also matches combined short flags such as "-tlnp"
+            short = re.fullmatch(r"-([A-Za-z])", flag)
+            checks[f"flag {flag}"] = any(
+                w == flag or w.startswith(flag + "=")
+                or (short is not None and re.fullmatch(r"-[A-Za-z]+", w) and short.group(1) in w)
+                for w in words
+            )
+    else:
+        lowered = output.lower()
+        for term in case.terms:
+            checks[f"mentions {term}"] = term.lower() in lowered
+    return checks
+
+
+@dataclass
+class CaseResult:
+    """Outcome of one case on one model."""
+    case: str
+    mode: str
+    stats: RequestStats
+    checks: Dict[str, bool] = field(default_factory=dict)
+    output: str = ""
+    error: Optional[str] = None
+    
+    @property
+    def score(self) -> float:
+        """Fraction of checks passed (0 on error)."""
+        if self.error is not None or not self.checks:
+            return 0.0
+        return sum(self.checks.values()) / len(self.checks)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "case": self.case,
+            "mode": self.mode,
+            "score": self.score,
+            "checks": self.checks,
+            "error": self.error,
+            "output": self.output,
+            "stats": self.stats.to_dict(),
+        }
+
+
+@dataclass
+class ModelReport:
+    """Aggregate benchmark results for one model."""
+    model: str
+    preload_time: Optional[float] = None
+    cases: List[CaseResult] = field(default_factory=list)
+    error: Optional[str] = None
+    
+    @staticmethod
+    def _mean(values: List[Optional[float]]) -> Optional[float]:
+        values = [v for v in values if v is not None]
+        return sum(values) / len(values) if values else None
+    
+    @property
+    def quality(self) -> float:
+        """Mean case score."""
+        return self._mean([c.score for c in self.cases]) or 0.0
+    
+    @property
+    def errors(self) -> int:
+        """Cases that failed with an error rather than an answer."""
+        return sum(1 for c in self.cases if c.error is not None)
+    
+    @property
+    def ttft(self) -> Optional[float]:
+        """Mean time to first token of successful cases."""
+        return self._mean([c.stats.ttft for c in self.cases if c.error is None])
+    
+    @property
+    def prefill_tps(self) -> Optional[float]:
+        """Mean prompt tokens per second."""
+        return self._mean([c.stats.prefill_tps for c in self.cases])
+    
+    @property
+    def decode_tps(self) -> Optional[float]:
+        """Mean generated tokens per second."""
+        return self._mean([c.stats.decode_tps for c in self.cases])
+    
+    @property
+    def peak_load(self) -> Optional[float]:
+        """Longest model load seen, including the initial preload."""
+        loads = [c.stats.load_duration for c in self.cases if c.stats.load_duration is not None]
+        if self.preload_time is not None:
+            loads.append(self.preload_time)
+        return max(loads) if loads else None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "quality": self.quality,
+            "errors": self.errors,
+            "ttft": self.ttft,
+            "prefill_tps": self.prefill_tps,
+            "decode_tps": self.decode_tps,
+            "peak_load": self.peak_load,
+            "preload_time": self.preload_time,
+            "error": self.error,
+            "cases": [c.to_dict() for c in self.cases],
+        }
+
+
+def rank(reports: List[ModelReport]) -> List[ModelReport]:
+    """Order models by quality, then decode speed."""
+    return sorted(reports, key=lambda r: (-r.quality, -(r.decode_tps or 0.0)))
+
+
+async def bench_model(
+    client: OllamaClient,
+    model: str,
+    cases: List[BenchCase],
+    repeat: int = 1,
+    progress: Optional[Callable[[str, str], None]] = None
+) -> ModelReport:
+    """
+    Run the corpus against one model.
+
+    The model is preloaded first (the cold load time counts towards its
+    peak load). Each case runs ``repeat`` times; every run is reported.
+    """
+    report = ModelReport(model=model)
+    try:
+        report.preload_time = await client.preload(model)
+    except (OllamaError, httpx.HTTPError) as e:
+        report.error = str(e) or e.__class__.__name__
+        return report
+    
+    generate_prompt = GeneralGeneratePrompt()
+    explain_prompt = GeneralExplainPrompt()
+    for case in cases:
+        if case.mode == "generate":
+            prompt = generate_prompt.format(case.input, os_context=BENCH_OS, shell=BENCH_SHELL)
+        else:
+            prompt = explain_prompt.format(case.input)
+        for _ in range(repeat):
+            if progress is not None:
+                progress(model, case.name)
+            stats = RequestStats(mode=case.mode, model=model, persona="general")
+            metadata: Dict[str, Any] = {}
+            result = CaseResult(case=case.name, mode=case.mode, stats=stats)
+            try:
+                stream = await client.generate(
+                    prompt=prompt.user,
+                    system=prompt.system,
+                    model=model,
+                    stream=True,
+                    metadata=metadata
+                )
+                chunks = []
+                async for chunk in stream:
+                    stats.mark_first_token()
+                    chunks.append(chunk)
+                result.output = "".join(chunks)
+                result.checks = check_case(case, result.output)
+            except (OllamaError, httpx.HTTPError) as e:
+                result.error = str(e) or e.__class__.__name__
+            stats.finish(metadata)
+            report.cases.append(result)
+    return report
+
+
+def bench_models_report(reports: List[ModelReport], cases: List[BenchCase]) -> Dict[str, Any]:
+    """Machine-readable results for tracking across releases."""
+    return {
+        "created": time.time(),
+        "os": BENCH_OS,
+        "shell": BENCH_SHELL,
+        "cases": [c.name for c in cases],
+        "models": [r.to_dict() for r in rank(reports)],
+    }
@@ -0,0 +1,71 @@
+"""
+Incremental NDJSON decoder for Ollama streaming responses.
+Splits raw response bytes into records without decoding text line by line.
+"""
+
+import json
+from typing import AsyncIterator, AsyncGenerator, Iterator, Dict, Any
+
+try:
+    import orjson
+    JSON_BACKEND = "orjson"
+except ImportError:  # pragma: no cover - depends on optional extra
+    orjson = None
+    JSON_BACKEND = "json"
+
+_decode = json.JSONDecoder().decode
+
+
+def _parse_lines(block: bytes) -> Iterator[Dict[str, Any]]:
+    """Parse a block of complete NDJSON lines."""
+    if orjson is not None:
+        # orjson parses bytes directly, no text decode needed
+        for line in block.split(b"\n"):
+            if line:
+                yield orjson.loads(line)
+    else:
+        # The stdlib parser wants str; decode the whole block once
+        for line in block.decode("utf-8").split("\n"):
+            if line:
+                yield _decode(line)
+
+
+class NDJSONDecoder:
+    """
+    Decodes newline-delimited JSON from arbitrarily split byte chunks.
+    
+    Each chunk's complete lines are cut from the buffer in one slice and
+    parsed as a block: straight from bytes with orjson when installed,
+    or with a single text decode per chunk using the stdlib parser.
+    """
+    
+    def __init__(self):
+        self._buffer = bytearray()
+    
+    def feed(self, chunk: bytes) -> Iterator[Dict[str, Any]]:
+        """Add a chunk and yield every record it completes."""
+        buffer = self._buffer
+        buffer += chunk
+        end = buffer.rfind(b"\n")
+        if end < 0:
+            return
+        block = bytes(buffer[:end])
+        del buffer[:end + 1]
+        yield from _parse_lines(block)
+    
+    def flush(self) -> Iterator[Dict[str, Any]]:
+        """Yield a trailing record that had no terminating newline."""
+        block = bytes(self._buffer)
+        self._buffer.clear()
+        yield from _parse_lines(block.strip())
+    
+    async def decode(
+        self,
+        chunks: AsyncIterator[bytes]
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Decode an async stream of byte chunks into records."""
+        async for chunk in chunks:
+            for record in self.feed(chunk):
+                yield record
+        for record in self.flush():
+            yield record
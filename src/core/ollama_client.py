@@ -4,12 +4,18 @@ Provides async interface to local Ollama instance.
 """
 
 import asyncio
-from typing import AsyncGenerator, Optional, List, Dict, Any
+import time
+from typing import AsyncGenerator, Optional, List, Dict, Any, Tuple
 
 import httpx
 from rich.console import Console
 
-from src.config.settings import get_settings
+from src.config.settings import get_settings, TransportSettings, HostSettings
+from src.core.host_pool import HostPool, OllamaHost, normalize_model
+from src.core.ndjson import NDJSONDecoder
+from src.core.resilience import RetryPolicy, HedgePolicy, CircuitBreaker, StateCache
+from src.core.scheduler import Priority, Ticket
+from src.core.transport import ConnectionStats
 
 
 console = Console()
@@ -34,65 +40,170 @@ class OllamaClient:
     """
     Async client for Ollama API.
     
-    Supports both streaming and non-streaming responses.
+    Supports both streaming and non-streaming responses. Requests are
+    routed across one or more Ollama hosts (``ollama.hosts``) to the
+    healthy host with the fewest outstanding requests that has the model.
     """
     
     def __init__(
         self,
         host: Optional[str] = None,
         model: Optional[str] = None,
-        timeout: Optional[int] = None
+        timeout: Optional[int] = None,
+        transport: Optional[TransportSettings] = None,
+        keep_alive: Optional[str] = None
     ):
         settings = get_settings()
-        self.host = host or settings.ollama.host
+        hosts = [HostSettings(url=host)] if host else settings.get_hosts()
+        self.host = hosts[0].url
         self.model = model or settings.get_model()
         self.timeout = timeout or settings.ollama.timeout
-        self._client: Optional[httpx.AsyncClient] = None
+        self.transport = transport or settings.ollama.transport
+        self.keep_alive = keep_alive or settings.ollama.keep_alive
+        self.connection_stats = ConnectionStats()
+        self.pool = HostPool(
+            hosts,
+            settings.ollama.pool,
+            self.timeout,
+            self.connection_stats,
+            self.transport,
+            settings.ollama.limiter
+        )
+        self.retry = RetryPolicy(settings.ollama.retry)
+        self.hedge = HedgePolicy(settings.ollama.hedge)
+        self.breaker = CircuitBreaker(settings.ollama.breaker)
+        self.state = StateCache(settings.ollama.state_ttl)
+        self.retried_requests = 0
+        self.hedged_requests = 0
+        # Model load time (seconds) reported by the most recent response
+        self.last_load_duration: Optional[float] = None
+        self._last_request_at = time.monotonic()
+        self._routing_lock = asyncio.Lock()
     
     async def __aenter__(self) -> "OllamaClient":
-        self._client = httpx.AsyncClient(
-            base_url=self.host,
-            timeout=httpx.Timeout(self.timeout)
-        )
+        await self._ensure_client()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self._client:
-            await self._client.aclose()
-            self._client = None
+        await self.close()
     
     async def _ensure_client(self) -> httpx.AsyncClient:
-        """Ensure we have an active HTTP client."""
-        if self._client is None:
-            self._client = httpx.AsyncClient(
-                base_url=self.host,
-                timeout=httpx.Timeout(self.timeout)
+        """Ensure we have an active, pooled HTTP client for the primary host."""
+        return self.pool.client(self.pool.primary)
+    
+    def _connection_error(self, host: Optional[str] = None) -> OllamaConnectionError:
+        """Build the standard 'cannot connect' error."""
+        return OllamaConnectionError(
+            f"Cannot connect to Ollama at {host or self.host}. Is it running?"
+        )
+    
+    def _check_breaker(self):
+        """Fail fast while the circuit breaker is open."""
+        if self.breaker.is_open:
+            raise OllamaConnectionError(
+                f"Cannot connect to Ollama at {self.host}. Is it running? "
+                f"(skipping requests for {self.breaker.remaining():.0f}s after repeated failures)"
             )
-        return self._client
+    
+    def invalidate_state(self):
+        """Forget cached health and model information."""
+        self.state.invalidate()
+        for host in self.pool.hosts:
+            host.models = None
     
     async def check_health(self) -> bool:
-        """Check if Ollama is running and accessible."""
-        try:
-            client = await self._ensure_client()
-            response = await client.get("/api/version")
-            return response.status_code == 200
-        except httpx.ConnectError:
-            return False
-        except Exception:
+        """
+        Check if Ollama is running and accessible on any host.
+        
+        The result is reused for state_ttl seconds, and is False without
+        touching the network while the circuit breaker is open.
+        """
+        hit, healthy = self.state.get("health")
+        if hit:
+            return healthy
+        if self.breaker.is_open:
             return False
+        
+        healthy = False
+        for host in self.pool.hosts:
+            try:
+                response = await self.pool.client(host).get("/api/version")
+                if response.status_code == 200:
+                    self.pool.mark_success(host)
+                    healthy = True
+                    break
+            except httpx.ConnectError:
+                self.pool.mark_failure(host)
+                continue
+            except Exception:
+                continue
+        
+        if healthy:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        self.state.set("health", healthy)
+        return healthy
+    
+    async def _host_models(self, host: OllamaHost) -> List[Dict[str, Any]]:
+        """Fetch one host's /api/tags and remember which models it has."""
+        response = await self.pool.client(host).get("/api/tags")
+        response.raise_for_status()
+        models = response.json().get("models", [])
+        self.pool.set_models(host, (m.get("name", "") for m in models))
+        return models
     
     async def list_models(self) -> List[Dict[str, Any]]:
-        """List all available models in Ollama."""
-        try:
-            client = await self._ensure_client()
-            response = await client.get("/api/tags")
-            response.raise_for_status()
-            data = response.json()
-            return data.get("models", [])
-        except httpx.ConnectError as e:
-            raise OllamaConnectionError(
-                f"Cannot connect to Ollama at {self.host}. Is it running?"
-            ) from e
+        """
+        List all available models across the configured hosts.
+        
+        The merged list (which also carries model digests) is reused for
+        state_ttl seconds and dropped when a request reports a missing model.
+        """
+        hit, models = self.state.get("models")
+        if hit:
+            return models
+        self._check_breaker()
+        
+        merged: Dict[str, Dict[str, Any]] = {}
+        error: Optional[httpx.HTTPError] = None
+        reached = False
+        
+        for host in self.pool.hosts:
+            try:
+                models = await self._host_models(host)
+            except httpx.HTTPError as e:
+                error = error or e
+                if isinstance(e, httpx.ConnectError):
+                    self.pool.mark_failure(host)
+                continue
+            reached = True
+            for m in models:
+                merged.setdefault(m.get("name", ""), m)
+        
+        if not reached:
+            if isinstance(error, httpx.ConnectError):
+                self.breaker.record_failure()
+                raise self._connection_error() from error
+            raise error
+        
+        self.breaker.record_success()
+        models = list(merged.values())
+        self.state.set("models", models)
+        return models
+    
+    async def _refresh_routing(self, model: str):
+        """Discover which hosts have a model, for multi-host pools."""
+        if not self.pool.multi:
+            return
+        # One refresh at a time; concurrent callers reuse its result
+        async with self._routing_lock:
+            for host in self.pool.hosts:
+                if host.healthy and self.pool.models_stale(host):
+                    try:
+                        await self._host_models(host)
+                    except httpx.HTTPError:
+                        self.pool.mark_failure(host)
     
     async def model_exists(self, model_name: Optional[str] = None) -> bool:
         """Check if a specific model is available."""
@@ -106,12 +217,105 @@ class OllamaClient:
         except OllamaError:
             return False
     
+    async def model_digest(self, model_name: Optional[str] = None) -> Optional[str]:
+        """Get the digest of an installed model, or None if it isn't installed."""
+        model = model_name or self.model
+        wanted = model if ":" in model else f"{model}:latest"
+        for m in await self.list_models():
+            if m.get("name") in (model, wanted):
+                return m.get("digest")
+        return None
+    
+    def idle_for(self) -> float:
+        """Seconds since this client last sent a request to /api/generate."""
+        return time.monotonic() - self._last_request_at
+    
+    def _build_payload(
+        self,
+        prompt: str,
+        system: Optional[str],
+        model: Optional[str],
+        stream: bool,
+        context: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """Build an /api/generate payload."""
+        self._last_request_at = time.monotonic()
+        payload = {
+            "model": model or self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive
+        }
+        
+        if system:
+            payload["system"] = system
+        
+        if context:
+            payload["context"] = context
+        
+        return payload
+    
+    def _record_metadata(
+        self,
+        data: Dict[str, Any],
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """Keep the metadata Ollama attaches to a finished response."""
+        if "load_duration" in data:
+            self.last_load_duration = data["load_duration"] / 1e9
+        if metadata is not None:
+            metadata.update((k, v) for k, v in data.items() if k != "response")
+    
+    async def preload(self, model: Optional[str] = None) -> float:
+        """
+        Load a model into memory without generating anything.
+        
+        Sends an empty prompt with the configured keep_alive, which also
+        resets Ollama's unload timer when the model is already resident.
+        
+        With multiple hosts, every healthy host that has the model is
+        preloaded so any of them can serve the next request warm.
+        
+        Returns:
+            Wall-clock seconds the preload took
+        """
+        model = model or self.model
+        payload = {
+            "model": model,
+            "keep_alive": self.keep_alive
+        }
+        self._last_request_at = time.monotonic()
+        started = time.perf_counter()
+        
+        await self._refresh_routing(model)
+        results = await asyncio.gather(
+            *(self.pool.client(h).post("/api/generate", json=payload)
+              for h in self.pool.hosts_with(model)),
+            return_exceptions=True
+        )
+        
+        error: Optional[BaseException] = None
+        for result in results:
+            try:
+                if isinstance(result, BaseException):
+                    raise result
+                result.raise_for_status()
+                self._record_metadata(result.json())
+                return time.perf_counter() - started
+            except httpx.HTTPError as e:
+                error = error or e
+        
+        raise self._translate_error(error, model) from error
+    
     async def generate(
         self,
         prompt: str,
         system: Optional[str] = None,
         model: Optional[str] = None,
-        stream: bool = False
+        stream: bool = False,
+        context: Optional[List[int]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        ticket: Optional[Ticket] = None
     ) -> str | AsyncGenerator[str, None]:
         """
         Generate a response from the LLM.
@@ -121,82 +325,236 @@ class OllamaClient:
             system: Optional system prompt
             model: Override the default model
             stream: If True, return an async generator for streaming
+            context: Token context returned by a previous response, to continue it
+            metadata: Optional dict filled with the final response record
+                (context, durations, token counts) once generation finishes
+            ticket: Scheduler ticket the request runs under; its priority
+                orders the wait for room under a host's concurrency limit
             
         Returns:
             Complete response string, or async generator if streaming
         """
         if stream:
-            return self._generate_stream(prompt, system, model)
-        return await self._generate_complete(prompt, system, model)
+            return self._generate_stream(prompt, system, model, context, metadata, ticket)
+        return await self._generate_complete(prompt, system, model, context, metadata, ticket)
+    
+    def _translate_error(
+        self,
+        error: httpx.HTTPError,
+        model: str,
+        host: Optional[str] = None
+    ) -> OllamaError:
+        """Map a transport-level failure to the client's exception types."""
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout)):
+            return self._connection_error(host)
+        if isinstance(error, httpx.HTTPStatusError) and error.response.status_code == 404:
+            return OllamaModelNotFoundError(
+                f"Model '{model}' not found. Run: ollama pull {model}"
+            )
+        return OllamaError(f"Ollama API error: {error}")
+    
+    async def _attempt(
+        self,
+        payload: Dict[str, Any],
+        host: OllamaHost,
+        ticket: Optional[Ticket] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Send one /api/generate request to a host and yield its decoded records.
+        
+        Tracks the host's outstanding requests and feeds connection and
+        server failures into its health state. When the host has an
+        adaptive limiter, the request waits for room under the limit and
+        reports its time to first token and time per output token to it;
+        the final record carries the limit it ran under. While the request
+        is at the host it is counted on ``ticket``, so preemption can tell
+        which background requests actually hold an Ollama slot.
+        """
+        client = self.pool.client(host)
+        limiter = host.limiter
+        if limiter is not None:
+            await limiter.acquire(ticket.priority if ticket is not None else Priority.INTERACTIVE)
+        host.inflight += 1
+        if ticket is not None:
+            ticket.upstream += 1
+        started = time.perf_counter()
+        ttft: Optional[float] = None
+        tpot: Optional[float] = None
+        failed = False
+        try:
+            async with client.stream("POST", "/api/generate", json=payload) as response:
+                response.raise_for_status()
+                self.pool.mark_success(host)
+                async for data in NDJSONDecoder().decode(response.aiter_bytes()):
+                    if "error" in data:
+                        raise OllamaError(f"Ollama API error: {data['error']}")
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                    if data.get("done"):
+                        if data.get("eval_count") and data.get("eval_duration"):
+                            tpot = data["eval_duration"] / data["eval_count"] / 1e9
+                        if limiter is not None:
+                            data["concurrency_limit"] = limiter.limit
+                    yield data
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404 and host.models is not None:
+                # Our view of this host's models is out of date
+                host.models.discard(normalize_model(payload["model"]))
+            elif self.retry.is_retryable(e):
+                self.pool.mark_failure(host)
+                failed = True
+            raise
+        except httpx.TransportError:
+            self.pool.mark_failure(host)
+            failed = True
+            raise
+        finally:
+            host.inflight -= 1
+            if ticket is not None:
+                ticket.upstream -= 1
+            if limiter is not None:
+                # Only completed requests say anything about latency
+                complete = tpot is not None
+                limiter.release(
+                    ttft=ttft if complete else None,
+                    tpot=tpot,
+                    failed=failed
+                )
+    
+    async def _first_record(
+        self,
+        payload: Dict[str, Any],
+        ticket: Optional[Ticket] = None
+    ) -> Tuple[Dict[str, Any], AsyncGenerator[Dict[str, Any], None]]:
+        """
+        Start a request and wait for its first record, hedging if it is slow.
+        
+        When hedging is enabled, there is another host to send it to and
+        no record arrives within the hedge delay, a duplicate request is
+        fired; whichever produces a record first wins and the other is
+        cancelled, closing its HTTP stream so Ollama frees the slot. With
+        a single host a duplicate would only add load to the slow server.
+        
+        Returns:
+            The first record and the stream to read the rest from
+        """
+        started = time.perf_counter()
+        model = payload["model"]
+        host = self.pool.select(model)
+        primary = self._attempt(payload, host, ticket)
+        pending = {asyncio.ensure_future(primary.__anext__()): primary}
+        
+        try:
+            hedge_delay = self.hedge.delay() if self.pool.multi else None
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+                if not done:
+                    other = self.pool.select(model, exclude=[host])
+                    self.hedged_requests += 1
+                    duplicate = self._attempt(payload, other, ticket)
+                    pending[asyncio.ensure_future(duplicate.__anext__())] = duplicate
+            
+            error: Optional[BaseException] = None
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    stream = pending.pop(task)
+                    if task.exception() is None:
+                        self.hedge.observe(time.perf_counter() - started)
+                        return task.result(), stream
+                    error = error or task.exception()
+            
+            if isinstance(error, StopAsyncIteration):
+                raise OllamaError("Ollama returned an empty response")
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for stream in pending.values():
+                await stream.aclose()
+    
+    async def _records(
+        self,
+        payload: Dict[str, Any],
+        ticket: Optional[Ticket] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Yield response records for a payload, applying the retry policy.
+        
+        Retries only happen before the first record has been produced, so
+        callers never see duplicated output.
+        """
+        model = payload["model"]
+        self._check_breaker()
+        await self._refresh_routing(model)
+        for attempt in range(1, self.retry.attempts + 1):
+            try:
+                first, stream = await self._first_record(payload, ticket)
+                break
+            except OllamaError:
+                raise
+            except httpx.HTTPError as e:
+                if attempt >= self.retry.attempts or not self.retry.is_retryable(e):
+                    error = self._translate_error(e, model)
+                    if isinstance(error, OllamaConnectionError):
+                        self.breaker.record_failure()
+                    elif isinstance(error, OllamaModelNotFoundError):
+                        # The cached model list no longer matches the server
+                        self.state.invalidate("models")
+                    raise error from e
+                self.retried_requests += 1
+                await asyncio.sleep(self.retry.delay(attempt))
+        
+        self.breaker.record_success()
+        
+        try:
+            yield first
+            async for data in stream:
+                yield data
+        except httpx.HTTPError as e:
+            raise self._translate_error(e, model) from e
+        finally:
+            await stream.aclose()
     
     async def _generate_complete(
         self,
         prompt: str,
         system: Optional[str] = None,
-        model: Optional[str] = None
+        model: Optional[str] = None,
+        context: Optional[List[int]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        ticket: Optional[Ticket] = None
     ) -> str:
         """Generate a complete (non-streaming) response."""
-        client = await self._ensure_client()
-        
-        payload = {
-            "model": model or self.model,
-            "prompt": prompt,
-            "stream": False
-        }
+        payload = self._build_payload(prompt, system, model, False, context)
         
-        if system:
-            payload["system"] = system
-        
-        try:
-            response = await client.post("/api/generate", json=payload)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("response", "")
-        except httpx.ConnectError as e:
-            raise OllamaConnectionError(
-                f"Cannot connect to Ollama at {self.host}. Is it running?"
-            ) from e
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 404:
-                raise OllamaModelNotFoundError(
-                    f"Model '{model or self.model}' not found. Run: ollama pull {model or self.model}"
-                ) from e
-            raise OllamaError(f"Ollama API error: {e}") from e
+        parts = []
+        async for data in self._records(payload, ticket):
+            parts.append(data.get("response", ""))
+            if data.get("done"):
+                self._record_metadata(data, metadata)
+        return "".join(parts)
     
     async def _generate_stream(
         self,
         prompt: str,
         system: Optional[str] = None,
-        model: Optional[str] = None
+        model: Optional[str] = None,
+        context: Optional[List[int]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        ticket: Optional[Ticket] = None
     ) -> AsyncGenerator[str, None]:
         """Generate a streaming response."""
-        client = await self._ensure_client()
-        
-        payload = {
-            "model": model or self.model,
-            "prompt": prompt,
-            "stream": True
-        }
+        payload = self._build_payload(prompt, system, model, True, context)
         
-        if system:
-            payload["system"] = system
-        
-        try:
-            async with client.stream("POST", "/api/generate", json=payload) as response:
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if line:
-                        import json
-                        data = json.loads(line)
-                        if "response" in data:
-                            yield data["response"]
-        except httpx.ConnectError as e:
-            raise OllamaConnectionError(
-                f"Cannot connect to Ollama at {self.host}. Is it running?"
-            ) from e
+        async for data in self._records(payload, ticket):
+            token = data.get("response")
+            if token:
+                yield token
+            if data.get("done"):
+                self._record_metadata(data, metadata)
     
     async def close(self):
         """Close the HTTP client."""
-        if self._client:
-            await self._client.aclose()
-            self._client = None
+        await self.pool.close()
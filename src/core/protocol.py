@@ -0,0 +1,161 @@
+"""
+Wire protocol between the cmdex client and the cmdexd daemon.
+Length-prefixed JSON frames over a per-user Unix socket; stdlib only, so
+the thin client can use it without importing the rest of the package.
+"""
+
+import json
+import os
+import socket
+import struct
+from typing import Optional, Dict, Any
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not on Windows
+    fcntl = None
+
+
+# Bumped on incompatible changes; a mismatched daemon tells the client
+# to run the request itself
+VERSION = 2
+
+# Frame header: payload length as a 4-byte big-endian unsigned int
+HEADER = struct.Struct("!I")
+MAX_FRAME = 16 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    """A malformed or oversized frame."""
+    pass
+
+
+def socket_path() -> str:
+    """
+    Where cmdexd listens.
+
+    ``CMDEX_SOCKET`` overrides; otherwise the per-user runtime directory,
+    falling back to ``~/.cmdex``.
+    """
+    override = os.environ.get("CMDEX_SOCKET")
+    if override:
+        return os.path.expanduser(override)
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, "cmdexd.sock")
+    return os.path.join(os.path.expanduser("~"), ".cmdex", "cmdexd.sock")
+
+
+def lock_path() -> str:
+    """The file cmdexd holds an exclusive lock on for as long as it runs."""
+    return socket_path() + ".lock"
+
+
+def acquire_lock() -> Optional[int]:
+    """
+    Take the daemon lock without waiting.
+
+    Returns the lock file's descriptor, which must stay open for as long
+    as the lock is held, or None if another cmdexd holds it.
+    """
+    fd = os.open(lock_path(), os.O_RDWR | os.O_CREAT, 0o600)
+    if fcntl is None:
+        return fd
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def lock_held() -> bool:
+    """Whether a cmdexd holds the daemon lock, i.e. is running or starting up."""
+    try:
+        fd = acquire_lock()
+    except OSError:
+        return False
+    if fd is None:
+        return True
+    os.close(fd)
+    return False
+
+
+def pack(message: Dict[str, Any]) -> bytes:
+    """Encode one message as a frame."""
+    payload = json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(payload) > MAX_FRAME:
+        raise ProtocolError(f"Frame of {len(payload)} bytes exceeds {MAX_FRAME}")
+    return HEADER.pack(len(payload)) + payload
+
+
+def frame_size(header: bytes) -> int:
+    """Payload length announced by a frame header."""
+    (size,) = HEADER.unpack(header)
+    if size > MAX_FRAME:
+        raise ProtocolError(f"Frame of {size} bytes exceeds {MAX_FRAME}")
+    return size
+
+
+def unpack(payload: bytes) -> Dict[str, Any]:
+    """Decode a frame payload."""
+    try:
+        message = json.loads(payload)
+    except ValueError as e:
+        raise ProtocolError(f"Invalid frame: {e}") from e
+    if not isinstance(message, dict):
+        raise ProtocolError("Frame is not a JSON object")
+    return message
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data.extend(chunk)
+    return bytes(data)
+
+
+def recv(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    """Read one message from a blocking socket; None once the peer has closed it."""
+    header = _recv_exactly(sock, HEADER.size)
+    if header is None:
+        return None
+    payload = _recv_exactly(sock, frame_size(header))
+    if payload is None:
+        return None
+    return unpack(payload)
+
+
+def connect(timeout: Optional[float] = None) -> Optional[socket.socket]:
+    """Connect to a running daemon, or None if there isn't one."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path())
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def request(message: Dict[str, Any], timeout: Optional[float] = 5.0) -> Optional[Dict[str, Any]]:
+    """
+    Send one control message (status, shutdown) and return the reply.
+
+    None if no daemon answers properly: not running, still starting,
+    hung past ``timeout`` or sending garbage.
+    """
+    sock = connect(timeout)
+    if sock is None:
+        return None
+    with sock:
+        try:
+            sock.sendall(pack(dict(message, v=VERSION)))
+            return recv(sock)
+        except (OSError, ProtocolError):
+            return None
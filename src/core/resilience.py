@@ -0,0 +1,144 @@
+"""
+Retry, hedging and failure-handling policies for the Ollama client.
+"""
+
+import random
+import time
+from collections import deque
+from typing import Optional, Dict, Tuple, Any
+
+import httpx
+
+from src.config.settings import RetrySettings, HedgeSettings, BreakerSettings
+
+
+# Status codes Ollama returns while busy or swapping models
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+    
+    Only failures that happen before the first token are retried, so a
+    retry never duplicates output the caller has already seen.
+    """
+    
+    def __init__(self, settings: RetrySettings):
+        self.attempts = max(settings.attempts, 1)
+        self.backoff_base = settings.backoff_base
+        self.backoff_max = settings.backoff_max
+    
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before retry number ``attempt`` (1-based)."""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+    
+    @staticmethod
+    def is_retryable(error: BaseException) -> bool:
+        """Whether a pre-first-token failure is worth another attempt."""
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in RETRYABLE_STATUS
+        return isinstance(error, (
+            httpx.ConnectError,
+            httpx.ConnectTimeout,
+            httpx.ReadTimeout,
+            httpx.ReadError,
+            httpx.RemoteProtocolError,
+        ))
+
+
+class HedgePolicy:
+    """
+    Decides when to fire a duplicate request.
+    
+    Tracks recently observed time-to-first-token and hedges once a request
+    has waited longer than the configured percentile of those samples.
+    Until enough samples exist, the fixed ``delay`` is used.
+    """
+    
+    def __init__(self, settings: HedgeSettings):
+        self.enabled = settings.enabled
+        self.percentile = settings.percentile
+        self.min_samples = settings.min_samples
+        self.min_delay = settings.min_delay
+        self.fallback_delay = settings.delay
+        self._samples = deque(maxlen=settings.window)
+    
+    def observe(self, ttft: float):
+        """Record a time-to-first-token sample."""
+        self._samples.append(ttft)
+    
+    def delay(self) -> Optional[float]:
+        """Seconds to wait for a first token before hedging, or None to never hedge."""
+        if not self.enabled:
+            return None
+        if len(self._samples) < self.min_samples:
+            return self.fallback_delay
+        ordered = sorted(self._samples)
+        index = min(int(len(ordered) * self.percentile), len(ordered) - 1)
+        return max(ordered[index], self.min_delay)
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated connection errors.
+    
+    After ``threshold`` consecutive failures the circuit opens and calls
+    are rejected for ``cooldown`` seconds. The first call after that is
+    let through as a trial: success closes the circuit, failure reopens it.
+    """
+    
+    def __init__(self, settings: BreakerSettings):
+        self.threshold = max(settings.threshold, 1)
+        self.cooldown = settings.cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+    
+    def remaining(self) -> float:
+        """Seconds until the circuit allows a trial call (0 when closed)."""
+        if self.opened_at is None:
+            return 0.0
+        return max(self.opened_at + self.cooldown - time.monotonic(), 0.0)
+    
+    @property
+    def is_open(self) -> bool:
+        """Whether calls should currently be rejected."""
+        return self.remaining() > 0
+    
+    def record_success(self):
+        """Close the circuit."""
+        self.failures = 0
+        self.opened_at = None
+    
+    def record_failure(self):
+        """Count a connection failure, opening the circuit at the threshold."""
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class StateCache:
+    """Small TTL cache for client-side state such as health and the model list."""
+    
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[Any, float]] = {}
+    
+    def get(self, name: str) -> Tuple[bool, Any]:
+        """Return (hit, value) for a fresh entry."""
+        entry = self._entries.get(name)
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            return False, None
+        return True, entry[0]
+    
+    def set(self, name: str, value: Any):
+        """Store a value, stamped now."""
+        self._entries[name] = (value, time.monotonic())
+    
+    def invalidate(self, name: Optional[str] = None):
+        """Drop one entry, or everything."""
+        if name is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(name, None)
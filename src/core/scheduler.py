@@ -0,0 +1,150 @@
+"""
+Priority scheduling of generation requests for Command Explainer.
+Caps requests in flight at the backend's parallel slots, serves
+interactive work first, and preempts background work to make room.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Callable, Optional, List, Dict, Any
+
+
+class Priority(IntEnum):
+    """Request classes, most urgent first."""
+    INTERACTIVE = 0  # a person is waiting on the answer
+    PREFETCH = 1  # speculative work such as history precompute
+    BULK = 2  # batch jobs
+
+
+@dataclass(eq=False)
+class Ticket:
+    """A granted (or pending) scheduler slot."""
+    priority: Priority
+    seq: int
+    granted_at: Optional[float] = None
+    preempted: bool = False
+    # Requests this ticket currently has in flight at Ollama (set by the client)
+    upstream: int = 0
+    # Task doing preemptible work while the slot is held; cancelled on preemption
+    work: Optional[asyncio.Task] = field(default=None, repr=False)
+
+
+class Scheduler:
+    """
+    Admission control for requests to Ollama.
+
+    At most ``slots`` requests run at once (match the server's
+    OLLAMA_NUM_PARALLEL, or the pool's total across hosts), and no more
+    than ``capacity()`` when that is given, so slots are only granted
+    while the hosts' adaptive limits have room and a granted request is
+    one actually running. Waiting requests are admitted by priority,
+    then arrival order. When an interactive request has to wait and
+    ``preempt`` is enabled, a background request is cancelled so the
+    interactive one takes its slot, preferring one already running at
+    Ollama (whose cancellation frees room there), then the most recently
+    started; the background request is re-queued.
+    """
+    
+    def __init__(
+        self,
+        slots: int,
+        preempt: bool = True,
+        capacity: Optional[Callable[[], Optional[int]]] = None
+    ):
+        self.slots = max(slots, 1)
+        self.preempt = preempt
+        self.capacity = capacity
+        self.running: List[Ticket] = []
+        self._waiting: List[tuple] = []  # heap of (priority, seq, ticket, future)
+        self._seq = itertools.count()
+        self.preemptions = 0
+        self.admitted: Dict[Priority, int] = {p: 0 for p in Priority}
+    
+    @property
+    def limit(self) -> int:
+        """Requests allowed to run right now."""
+        capacity = self.capacity() if self.capacity is not None else None
+        if capacity is None:
+            return self.slots
+        return max(min(self.slots, capacity), 1)
+    
+    @property
+    def waiting(self) -> int:
+        """Requests queued for a slot."""
+        return sum(1 for entry in self._waiting if not entry[3].done())
+    
+    def _waiting_count(self, priority: Priority) -> int:
+        return sum(1 for entry in self._waiting if entry[0] == priority and not entry[3].done())
+    
+    async def acquire(self, priority: Priority) -> Ticket:
+        """Wait for a slot. Must be paired with release()."""
+        ticket = Ticket(priority=priority, seq=next(self._seq))
+        if len(self.running) < self.limit and not self.waiting:
+            self._grant(ticket)
+            return ticket
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, ticket.seq, ticket, future))
+        if priority == Priority.INTERACTIVE and self.preempt:
+            self._preempt()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled: hand the slot on
+                self.release(ticket)
+            raise
+        return ticket
+    
+    def _grant(self, ticket: Ticket):
+        ticket.granted_at = time.monotonic()
+        self.running.append(ticket)
+        self.admitted[ticket.priority] += 1
+    
+    def release(self, ticket: Ticket):
+        """Give a slot back and admit the next waiter."""
+        if ticket in self.running:
+            self.running.remove(ticket)
+        ticket.work = None
+        self.poke()
+    
+    def poke(self):
+        """Admit waiters up to the current limit, e.g. after ``capacity()`` grew."""
+        while len(self.running) < self.limit and self._waiting:
+            _, _, waiter, future = heapq.heappop(self._waiting)
+            if future.done():
+                continue
+            self._grant(waiter)
+            future.set_result(None)
+    
+    def _preempt(self):
+        """Cancel background work so waiting interactive requests can start."""
+        freeing = sum(1 for t in self.running if t.preempted)
+        if self._waiting_count(Priority.INTERACTIVE) <= freeing:
+            return
+        victims = [
+            t for t in self.running
+            if t.priority > Priority.INTERACTIVE and t.work is not None and not t.preempted
+        ]
+        if not victims:
+            return
+        # Only cancelling a request that is running at Ollama frees a slot
+        # there; then lowest class first, and the one that has done the least work
+        victim = max(victims, key=lambda t: (t.upstream > 0, t.priority, t.granted_at))
+        victim.preempted = True
+        victim.work.cancel()
+        self.preemptions += 1
+    
+    def status(self) -> Dict[str, Any]:
+        """Current occupancy, for status output."""
+        return {
+            "slots": self.slots,
+            "limit": self.limit,
+            "running": len(self.running),
+            "waiting": self.waiting,
+            "preemptions": self.preemptions,
+        }
@@ -0,0 +1,142 @@
+"""
+In-flight request coalescing for Command Explainer.
+Identical concurrent requests share one upstream generation, with the
+token stream fanned out to every caller from the start.
+"""
+
+import asyncio
+from typing import AsyncGenerator, Awaitable, Callable, Optional, Dict, Any, List, Tuple
+
+
+# Starts the upstream request, filling in the response metadata as it completes
+Starter = Callable[[Dict[str, Any]], Awaitable[AsyncGenerator[str, None]]]
+
+
+class Flight:
+    """
+    One upstream generation shared by every caller that joined it.
+
+    Chunks are kept for the lifetime of the flight so late joiners replay
+    the stream from the first token before following it live.
+    """
+    
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.metadata: Dict[str, Any] = {}
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+    
+    def notify(self):
+        """Wake every subscriber waiting for the next chunk."""
+        self._changed.set()
+        self._changed = asyncio.Event()
+    
+    async def subscribe(
+        self,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Yield the flight's chunks from the beginning, then follow it live.
+
+        The caller must already be counted in ``subscribers`` (see
+        SingleFlight.join). Once the stream ends, the upstream response
+        metadata is copied into ``metadata``; an upstream error is raised
+        to every subscriber.
+        """
+        position = 0
+        try:
+            while True:
+                while position < len(self.chunks):
+                    yield self.chunks[position]
+                    position += 1
+                if self.done:
+                    break
+                await self._changed.wait()
+            if self.error is not None:
+                raise self.error
+            if metadata is not None:
+                metadata.update(self.metadata)
+        finally:
+            if self.leave():
+                # Last one out: let the upstream request close its
+                # connection before the caller moves on
+                await asyncio.wait({self.task})
+    
+    async def result(self, metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Wait for the whole response."""
+        chunks = []
+        async for chunk in self.subscribe(metadata):
+            chunks.append(chunk)
+        return "".join(chunks)
+    
+    def leave(self) -> bool:
+        """
+        Drop a subscriber; the upstream request is cancelled once nobody is left.
+        
+        Returns whether this call cancelled it.
+        """
+        self.subscribers -= 1
+        if self.subscribers <= 0 and not self.done and self.task is not None:
+            self.task.cancel()
+            return True
+        return False
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight requests.
+
+    The first caller for a key starts the upstream request in its own task;
+    callers arriving while it runs attach to the same flight instead of
+    sending a duplicate. Keys are forgotten as soon as the flight ends, so
+    this only deduplicates concurrent work; repeats later on are the
+    response cache's job.
+    """
+    
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        self.coalesced = 0
+    
+    def join(self, key: str, start: Starter) -> Tuple[Flight, bool]:
+        """
+        Attach to the flight for ``key``, starting it if none is running.
+
+        Returns the flight and whether this caller started it. The caller
+        must consume it with ``subscribe``/``result`` or call ``leave``.
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            flight.subscribers += 1
+            self.coalesced += 1
+            return flight, False
+        
+        flight = Flight()
+        flight.subscribers = 1
+        self._flights[key] = flight
+        flight.task = asyncio.create_task(self._drive(key, flight, start))
+        return flight, True
+    
+    async def _drive(self, key: str, flight: Flight, start: Starter):
+        """Run the upstream request, publishing each chunk to the flight."""
+        try:
+            stream = await start(flight.metadata)
+            async for chunk in stream:
+                flight.chunks.append(chunk)
+                flight.notify()
+        except asyncio.CancelledError:
+            flight.error = asyncio.CancelledError()
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.notify()
+    
+    @property
+    def inflight(self) -> int:
+        """Number of distinct upstream requests currently running."""
+        return len(self._flights)
@@ -0,0 +1,41 @@
+"""
+Detached background runs of cmdex commands.
+Stdlib only, so the shell widgets can start cmdexd without importing the CLI.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import List
+
+
+def spawn_background(args: List[str], log_path: Path, low_priority: bool = True):
+    """
+    Re-run a cmdex command detached from the terminal, logging to ``log_path``.
+    
+    The child keeps the current directory, so it reads the same
+    config.yaml; with ``low_priority`` it runs at reduced CPU priority.
+    """
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    log = open(log_path, "ab")
+    
+    def lower_priority():
+        if hasattr(os, "nice"):
+            os.nice(10)
+    
+    # Make the package importable by the child from any directory
+    package_root = str(Path(__file__).resolve().parent.parent.parent)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root, env.get("PYTHONPATH")]))
+    
+    subprocess.Popen(
+        [sys.executable, "-m", "src.main", *args],
+        stdin=subprocess.DEVNULL,
+        stdout=log,
+        stderr=log,
+        start_new_session=True,
+        preexec_fn=lower_priority if low_priority and os.name == "posix" else None,
+        env=env
+    )
+    log.close()
@@ -0,0 +1,132 @@
+"""
+Per-request performance statistics.
+Combines client-side timing with the metadata Ollama returns for a completion.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any
+
+
+NS = 1e9
+
+
+@dataclass
+class RequestStats:
+    """
+    Timing and throughput for a single engine call.
+    
+    Client-side times are measured from when the engine starts handling
+    the request; server-side durations come from Ollama's final response
+    record and are absent for cache hits. A coalesced call reports the
+    server statistics of the request it shared.
+    """
+    mode: str = ""
+    model: str = ""
+    persona: str = ""
+    cached: bool = False
+    coalesced: bool = False  # shared another caller's identical in-flight request
+    cancelled: bool = False  # stopped before the response completed
+    started: float = field(default_factory=time.perf_counter)
+    ttft: Optional[float] = None
+    total_time: Optional[float] = None
+    load_duration: Optional[float] = None
+    total_duration: Optional[float] = None
+    prompt_eval_count: Optional[int] = None
+    prompt_eval_duration: Optional[float] = None
+    eval_count: Optional[int] = None
+    eval_duration: Optional[float] = None
+    concurrency_limit: Optional[float] = None  # host's adaptive limit when the request ran
+    
+    def mark_first_token(self):
+        """Record time to first token, once."""
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.started
+    
+    def finish(self, metadata: Optional[Dict[str, Any]] = None):
+        """Record completion and absorb Ollama's response statistics."""
+        self.total_time = time.perf_counter() - self.started
+        if self.ttft is None and metadata and metadata.get("first_token_at") is not None:
+            # Whole-response callers: when the first token reached the engine
+            # (a coalesced caller that joined later counts from its own start)
+            self.ttft = max(metadata["first_token_at"] - self.started, 0.0)
+        if self.ttft is None:
+            self.ttft = self.total_time
+        if not metadata:
+            return
+        for name in ("load_duration", "total_duration", "prompt_eval_duration", "eval_duration"):
+            if metadata.get(name) is not None:
+                setattr(self, name, metadata[name] / NS)
+        for name in ("prompt_eval_count", "eval_count", "concurrency_limit"):
+            if metadata.get(name) is not None:
+                setattr(self, name, metadata[name])
+    
+    @property
+    def prefill_tps(self) -> Optional[float]:
+        """Prompt tokens processed per second."""
+        if self.prompt_eval_count and self.prompt_eval_duration:
+            return self.prompt_eval_count / self.prompt_eval_duration
+        return None
+    
+    @property
+    def decode_tps(self) -> Optional[float]:
+        """Generated tokens per second."""
+        if self.eval_count and self.eval_duration:
+            return self.eval_count / self.eval_duration
+        return None
+    
+    @property
+    def queue_wait(self) -> Optional[float]:
+        """
+        Time not accounted for by Ollama's own processing.
+        
+        Wall-clock time minus the server-reported total duration: waiting
+        for a free model slot plus network and connection overhead.
+        """
+        if self.total_time is None or self.total_duration is None:
+            return None
+        return max(self.total_time - self.total_duration, 0.0)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Flatten to a JSON-friendly dict."""
+        return {
+            "mode": self.mode,
+            "model": self.model,
+            "persona": self.persona,
+            "cached": self.cached,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+            "ttft": self.ttft,
+            "total_time": self.total_time,
+            "load_duration": self.load_duration,
+            "queue_wait": self.queue_wait,
+            "prompt_eval_count": self.prompt_eval_count,
+            "prefill_tps": self.prefill_tps,
+            "eval_count": self.eval_count,
+            "decode_tps": self.decode_tps,
+            "concurrency_limit": self.concurrency_limit,
+        }
+    
+    def summary(self) -> str:
+        """One-line human-readable summary."""
+        def secs(value: Optional[float]) -> str:
+            return f"{value:.2f}s" if value is not None else "n/a"
+        
+        def rate(value: Optional[float]) -> str:
+            return f"{value:.1f} tok/s" if value is not None else "n/a"
+        
+        if self.cached:
+            return f"cache hit in {secs(self.total_time)} ({self.model}, {self.persona})"
+        shared = " (coalesced)" if self.coalesced else ""
+        if self.cancelled:
+            return f"cancelled after {secs(self.total_time)} · TTFT {secs(self.ttft)}{shared}"
+        limit = (
+            f" · limit {self.concurrency_limit:.1f}"
+            if self.concurrency_limit is not None else ""
+        )
+        return (
+            f"TTFT {secs(self.ttft)}{shared} · total {secs(self.total_time)} · "
+            f"load {secs(self.load_duration)} · queue {secs(self.queue_wait)} · "
+            f"prefill {self.prompt_eval_count or 0} tok @ {rate(self.prefill_tps)} · "
+            f"decode {self.eval_count or 0} tok @ {rate(self.decode_tps)}{limit}"
+        )
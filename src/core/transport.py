@@ -0,0 +1,101 @@
+"""
+HTTP transport for the Ollama client.
+Builds a pooled keep-alive connection layer and tracks connection reuse.
+"""
+
+import importlib.util
+from dataclasses import dataclass
+from typing import Optional, Dict, Any
+
+import httpx
+
+from src.config.settings import TransportSettings, get_settings
+
+
+@dataclass
+class ConnectionStats:
+    """Counters for requests issued and connections opened by a transport."""
+    requests: int = 0
+    connections: int = 0
+    
+    @property
+    def reused(self) -> int:
+        """Requests served on an already-open connection."""
+        return max(self.requests - self.connections, 0)
+    
+    @property
+    def reuse_ratio(self) -> float:
+        """Fraction of requests that did not need a new connection."""
+        return self.reused / self.requests if self.requests else 0.0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "connections": self.connections,
+            "reused": self.reused,
+            "reuse_ratio": round(self.reuse_ratio, 3),
+        }
+
+
+class CountingTransport(httpx.AsyncHTTPTransport):
+    """
+    Connection-pooling transport that counts new connections.
+    
+    Uses httpcore's ``trace`` request extension to observe TCP and
+    Unix socket connects, so pooled reuse can be verified under load.
+    """
+    
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.requests += 1
+        previous = request.extensions.get("trace")
+        
+        async def trace(event: str, info: Dict[str, Any]):
+            if event in (
+                "connection.connect_tcp.complete",
+                "connection.connect_unix_socket.complete",
+            ):
+                self.stats.connections += 1
+            if previous is not None:
+                await previous(event, info)
+        
+        request.extensions["trace"] = trace
+        return await super().handle_async_request(request)
+
+
+def http2_available() -> bool:
+    """Check whether the optional h2 package is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+def build_http_client(
+    host: str,
+    timeout: int,
+    stats: ConnectionStats,
+    transport_settings: Optional[TransportSettings] = None
+) -> httpx.AsyncClient:
+    """
+    Build the pooled HTTP client an OllamaClient sends every request through.
+    
+    HTTP/2 is only negotiated when requested and h2 is installed; Ollama
+    itself speaks HTTP/1.1, so this matters for TLS-terminating proxies.
+    """
+    config = transport_settings or get_settings().ollama.transport
+    transport = CountingTransport(
+        stats,
+        http2=config.http2 and http2_available(),
+        uds=config.uds,
+        limits=httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+    )
+    return httpx.AsyncClient(
+        base_url=host,
+        timeout=httpx.Timeout(timeout, connect=config.connect_timeout),
+        transport=transport,
+    )
@@ -0,0 +1,272 @@
+"""
+cmdexd - warm Command Explainer daemon.
+Keeps a CommandEngine (settings, connection pool, caches, loaded model)
+alive behind a Unix socket so one-shot cmdex calls skip process startup.
+"""
+
+import asyncio
+import io
+import os
+import signal
+import time
+from typing import Optional, Dict, Any
+
+import httpx
+from rich.console import Console
+
+from src.core import protocol
+from src.core.engine import CommandEngine, Persona
+from src.core.jobs import JobRunner
+from src.core.ollama_client import OllamaError
+from src.core.stats import RequestStats
+from src.main import print_command, print_stats, report_failure, stream_response
+
+
+class _FrameStream(io.TextIOBase):
+    """File-like sink that forwards everything written to it as frames."""
+    
+    def __init__(self, writer: asyncio.StreamWriter, key: str = "out"):
+        self.writer = writer
+        self.key = key
+    
+    def write(self, text: str) -> int:
+        if text and not self.writer.is_closing():
+            self.writer.write(protocol.pack({self.key: text}))
+        return len(text)
+    
+    def flush(self):
+        pass
+
+
+class Daemon:
+    """
+    Serves generate/explain requests from thin cmdex clients.
+
+    Each connection carries one request frame; the answer streams back
+    as output frames rendered for the client's terminal, followed by an
+    exit frame. Every request runs as a job, and a client that hangs up
+    (Ctrl-C) cancels it, closing the request to Ollama.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or protocol.socket_path()
+        self.engine: Optional[CommandEngine] = None
+        self._uncached: Optional[CommandEngine] = None
+        self.runner: Optional[JobRunner] = None
+        self.started = time.time()
+        self.served = 0
+        self._stop = asyncio.Event()
+        self._lock: Optional[int] = None
+    
+    def lock(self) -> bool:
+        """
+        Take the daemon lock, held until serve() returns.
+
+        Returns False if another cmdexd holds it, running or still
+        starting up; only the lock holder may touch the socket.
+        """
+        if self._lock is None:
+            os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+            self._lock = protocol.acquire_lock()
+        return self._lock is not None
+    
+    async def serve(self):
+        """
+        Listen until stopped by SIGINT/SIGTERM or a shutdown request.
+
+        Returns straight away if another daemon holds the lock.
+        """
+        if not self.lock():
+            return
+        try:
+            await self._serve()
+        finally:
+            os.close(self._lock)
+            self._lock = None
+    
+    async def _serve(self):
+        if os.path.exists(self.path):
+            # Left behind by a daemon that didn't exit cleanly; we hold
+            # the lock, so nobody else is serving it
+            os.unlink(self.path)
+        
+        async with JobRunner() as runner:
+            self.runner = runner
+            runner.install_signal_handlers()
+            loop = asyncio.get_running_loop()
+            try:
+                loop.add_signal_handler(signal.SIGTERM, self._stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+            
+            self.engine = CommandEngine()
+            self.engine.start_keepalive()
+            server = await asyncio.start_unix_server(self._accept, path=self.path)
+            os.chmod(self.path, 0o600)
+            bound = os.stat(self.path).st_ino
+            try:
+                await self._stop.wait()
+            finally:
+                server.close()
+                try:
+                    # Only remove the socket this daemon bound
+                    if os.stat(self.path).st_ino == bound:
+                        os.unlink(self.path)
+                except OSError:
+                    pass
+                await runner.shutdown()
+                # The uncached engine shares this one's client, so this closes both
+                await self.engine.close()
+    
+    def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.runner.start(self._client(reader, writer), "client")
+    
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                header = await reader.readexactly(protocol.HEADER.size)
+                message = protocol.unpack(await reader.readexactly(protocol.frame_size(header)))
+            except (asyncio.IncompleteReadError, protocol.ProtocolError):
+                return
+            
+            op = message.get("op")
+            if message.get("v") != protocol.VERSION:
+                writer.write(protocol.pack({"fallback": True}))
+            elif op == "status":
+                writer.write(protocol.pack({"status": self.status(), "exit": 0}))
+            elif op == "shutdown":
+                writer.write(protocol.pack({"exit": 0}))
+                self._stop.set()
+            elif op in ("generate", "explain") and not self._valid_persona(message):
+                writer.write(protocol.pack({
+                    "err": f"cmdexd: unknown persona {message['persona']!r}\n",
+                    "exit": 2
+                }))
+            elif op in ("generate", "explain"):
+                status = await self._watch(message, reader, writer)
+                if status is not None:
+                    writer.write(protocol.pack({"exit": status}))
+            else:
+                writer.write(protocol.pack({"err": f"cmdexd: unknown request {op!r}\n", "exit": 2}))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    async def _watch(
+        self,
+        message: Dict[str, Any],
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ) -> Optional[int]:
+        """Run a request, cancelling it if the client hangs up first."""
+        job = self.runner.start(self._run(message, writer), message["op"])
+        hangup = asyncio.ensure_future(reader.read())
+        try:
+            done, _ = await asyncio.wait({job.task, hangup}, return_when=asyncio.FIRST_COMPLETED)
+            if job.task not in done:
+                job.cancel()
+                await asyncio.wait({job.task})
+                return None
+        finally:
+            hangup.cancel()
+        return job.task.result()
+    
+    @staticmethod
+    def _valid_persona(message: Dict[str, Any]) -> bool:
+        try:
+            if message.get("persona"):
+                Persona(message["persona"])
+        except ValueError:
+            return False
+        return True
+    
+    def _engine(self, message: Dict[str, Any]) -> CommandEngine:
+        if not message.get("no_cache"):
+            return self.engine
+        if self._uncached is None:
+            # Same client and scheduler, so no-cache requests count against
+            # the same slots and can be preempted like any other
+            self._uncached = CommandEngine(
+                client=self.engine.client,
+                use_cache=False,
+                scheduler=self.engine.scheduler
+            )
+        return self._uncached
+    
+    async def _run(self, message: Dict[str, Any], writer: asyncio.StreamWriter) -> int:
+        """Answer one request, rendering output as the full CLI would."""
+        if message.get("plain"):
+            return await self._run_plain(message, writer)
+        color = message.get("color")
+        out = Console(
+            file=_FrameStream(writer),
+            width=message.get("width") or 80,
+            force_terminal=color is not None,
+            color_system=color,
+            no_color=color is None
+        )
+        engine = self._engine(message)
+        persona = Persona(message["persona"]) if message.get("persona") else None
+        stats = RequestStats()
+        self.served += 1
+        try:
+            if message["op"] == "generate":
+                result = await engine.generate(
+                    message["text"],
+                    stream=False,
+                    stats=stats,
+                    persona=persona,
+                    shell=engine.detect_shell(message.get("shell") or "")
+                )
+                print_command(result.strip(), out)
+            else:
+                generator = await engine.explain(message["text"], stream=True, stats=stats, persona=persona)
+                await stream_response(generator, "Explanation", out)
+            if message.get("stats"):
+                print_stats(stats, out)
+        except (OllamaError, httpx.HTTPError) as e:
+            await report_failure(engine, e, out)
+        return 0
+    
+    async def _run_plain(self, message: Dict[str, Any], writer: asyncio.StreamWriter) -> int:
+        """
+        Answer a shell widget: just the command or the explanation text.
+
+        The result goes to the command line or below the prompt, so there
+        is no markup, and a failure exits 1 with its message as the output.
+        """
+        out = _FrameStream(writer)
+        engine = self._engine(message)
+        persona = Persona(message["persona"]) if message.get("persona") else None
+        self.served += 1
+        try:
+            if message["op"] == "generate":
+                result = await engine.generate(
+                    message["text"],
+                    stream=False,
+                    persona=persona,
+                    shell=engine.detect_shell(message.get("shell") or "")
+                )
+            else:
+                result = await engine.explain(message["text"], stream=False, persona=persona)
+        except (OllamaError, httpx.HTTPError) as e:
+            out.write(f"cmdex: {await engine.diagnose(e)}")
+            return 1
+        out.write(result.strip())
+        return 0
+    
+    def status(self) -> Dict[str, Any]:
+        """Daemon state, for ``cmdex daemon status``."""
+        engine = self.engine
+        return {
+            "pid": os.getpid(),
+            "socket": self.path,
+            "uptime": time.time() - self.started,
+            "served": self.served,
+            "model": engine.client.model,
+            "preload_time": engine.preload_time,
+            "scheduler": engine.scheduler.status(),
+            "jobs": len(self.runner.jobs),
+        }
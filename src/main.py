@@ -3,30 +3,39 @@ Command Explainer CLI - Main entry point.
 Terminal command generator and explainer powered by Ollama.
 """
 
-import asyncio
+import json
+import os
 import sys
-from typing import Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, List, Dict
 
 import click
 from rich.console import Console
-from rich.markdown import Markdown
 from rich.panel import Panel
-from rich.prompt import Prompt
 from rich.text import Text
-from rich.live import Live
+from rich.table import Table
 
-from src.core.engine import CommandEngine, Persona
-from src.core.ollama_client import OllamaError, OllamaConnectionError, OllamaModelNotFoundError
-from src.config.settings import get_settings
+from src.core import protocol
 from src import __version__
 
+# Everything else (asyncio, httpx, pydantic settings, the engine and its
+# persona prompts) is imported inside the commands that use it, so each
+# subcommand only pays for what it needs; see benchmarks/bench_startup.py
+if TYPE_CHECKING:
+    from src.core.batch import BatchResult, Throughput
+    from src.core.engine import CommandEngine
+    from src.core.history import HistoryIndex
+    from src.core.journal import JobJournal
+    from src.core.stats import RequestStats
+
 
 console = Console()
+err_console = Console(stderr=True)
 
 
-def print_error(message: str):
+def print_error(message: str, out: Console = console):
     """Print an error message."""
-    console.print(f"[bold red]Error:[/bold red] {message}")
+    out.print(f"[bold red]Error:[/bold red] {message}")
 
 
 def print_success(message: str):
@@ -34,36 +43,187 @@ def print_success(message: str):
     console.print(f"[bold green]✓[/bold green] {message}")
 
 
-def print_command(command: str):
+def print_command(command: str, out: Console = console):
     """Print a generated command."""
-    console.print(Panel(
+    out.print(Panel(
         Text(command, style="bold cyan"),
         title="[bold]Generated Command[/bold]",
         border_style="cyan"
     ))
 
 
-async def stream_response(generator, title: str = "Response"):
+def print_stats(stats: Optional["RequestStats"], out: Console = console):
+    """Print performance statistics for a single request."""
+    if stats is None:
+        out.print("[dim]No requests yet.[/dim]")
+        return
+    out.print(f"[dim]⏱  {stats.summary()}[/dim]")
+
+
+def print_cancelled(stats: Optional["RequestStats"] = None):
+    """Report a request stopped by Ctrl-C, with statistics for what it got through."""
+    console.print("\n[yellow]Cancelled[/yellow]")
+    if stats is not None and stats.total_time is not None:
+        print_stats(stats)
+
+
+def print_session_stats(history: List["RequestStats"], engine: "CommandEngine"):
+    """Print per-mode/persona/model averages for an interactive session."""
+    if not history:
+        console.print("[dim]No requests yet.[/dim]")
+        return
+    
+    print_stats(history[-1])
+    
+    groups: Dict[tuple, List[RequestStats]] = {}
+    for stats in history:
+        groups.setdefault((stats.mode, stats.persona, stats.model), []).append(stats)
+    
+    def average(values) -> str:
+        values = [v for v in values if v is not None]
+        return f"{sum(values) / len(values):.2f}" if values else "-"
+    
+    table = Table(title="Session Stats", border_style="blue")
+    for column in ("Mode", "Persona", "Model", "Requests", "Cached",
+                   "TTFT (s)", "Load (s)", "Prefill tok/s", "Decode tok/s"):
+        table.add_column(column)
+    for (mode, persona, model), items in groups.items():
+        table.add_row(
+            mode, persona, model,
+            str(len(items)),
+            str(sum(1 for s in items if s.cached)),
+            average(s.ttft for s in items),
+            average(s.load_duration for s in items),
+            average(s.prefill_tps for s in items),
+            average(s.decode_tps for s in items),
+        )
+    console.print(table)
+    
+    connections = engine.connection_stats()
+    console.print(
+        f"[dim]HTTP: {connections.requests} requests over "
+        f"{connections.connections} connections[/dim]"
+    )
+
+
+async def stream_response(generator, title: str = "Response", out: Console = console):
     """Stream and display a response from the LLM."""
+    import httpx
+    from src.core.ollama_client import OllamaError
+    
     full_response = ""
     
-    console.print(f"\n[bold]{title}:[/bold]")
-    console.print()
+    out.print(f"\n[bold]{title}:[/bold]")
+    out.print()
     
     try:
         async for chunk in generator:
-            console.print(chunk, end="")
+            out.print(chunk, end="")
             full_response += chunk
     except Exception as e:
-        print_error(f"Stream interrupted: {e}")
+        # Nothing streamed yet: let the caller report it as a failed request
+        if not full_response and isinstance(e, (OllamaError, httpx.HTTPError)):
+            raise
+        print_error(f"Stream interrupted: {e}", out)
     
-    console.print("\n")
+    out.print("\n")
     return full_response
 
 
+async def ask_async(prompt: str) -> str:
+    """
+    Read a line of input without blocking the event loop.
+    
+    Keeps background tasks (model keep-alive) running while the
+    REPL waits for the user.
+    """
+    import asyncio
+    import threading
+    from rich.prompt import Prompt
+    
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    
+    def _resolve(result=None, error=None):
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    
+    def _read():
+        try:
+            result = Prompt.ask(prompt)
+        except (EOFError, KeyboardInterrupt) as e:
+            loop.call_soon_threadsafe(_resolve, None, EOFError(str(e)))
+        else:
+            loop.call_soon_threadsafe(_resolve, result)
+    
+    threading.Thread(target=_read, daemon=True).start()
+    return await future
+
+
+def print_status(engine: "CommandEngine"):
+    """Print model residency information for the interactive session."""
+    client = engine.client
+    preload = f"{engine.preload_time:.2f}s" if engine.preload_time is not None else "pending"
+    load = (
+        f"{client.last_load_duration:.2f}s"
+        if client.last_load_duration is not None else "n/a"
+    )
+    console.print(f"  • Model: [yellow]{client.model}[/yellow] (keep_alive {client.keep_alive})")
+    console.print(f"  • Preload: {preload}")
+    console.print(f"  • Last load_duration: {load}")
+    scheduler = engine.scheduler.status()
+    console.print(
+        f"  • Scheduler: {scheduler['running']}/{scheduler['slots']} slots busy, "
+        f"{scheduler['waiting']} waiting, {scheduler['preemptions']} preemptions"
+    )
+
+
+async def report_failure(engine: "CommandEngine", error: Exception, out: Console = console):
+    """Diagnose a failed request and print a friendly error."""
+    print_error(await engine.diagnose(error), out)
+
+
+def run_job(main, name: str):
+    """
+    Run an entry point coroutine as a foreground job.
+    
+    Ctrl-C cancels the work in progress, closing any open request to
+    Ollama, and exits with status 130 instead of a traceback.
+    """
+    import asyncio
+    from src.core.jobs import JobCancelled, JobRunner
+    
+    async def _main():
+        async with JobRunner() as runner:
+            runner.install_signal_handlers()
+            return await runner.run(main, name)
+    
+    try:
+        return asyncio.run(_main())
+    except JobCancelled:
+        err_console.print("[yellow]Cancelled[/yellow]")
+        sys.exit(130)
+
+
 async def run_interactive(persona: str):
-    """Run interactive mode."""
+    """
+    Run interactive mode.
+    
+    Each prompt and request runs as a foreground job of the current
+    runner, so Ctrl-C stops only the request in progress.
+    """
+    from src.core.engine import CommandEngine, Persona
+    from src.core.jobs import JobCancelled, current_runner
+    from src.core.ollama_client import OllamaError
+    from src.core.stats import RequestStats
+    from src.config.settings import get_settings
+    
     settings = get_settings()
+    runner = current_runner()
     
     persona_enum = Persona(persona) if persona else Persona(settings.get_persona())
     
@@ -76,6 +236,9 @@ async def run_interactive(persona: str):
         await engine.close()
         return
     
+    # Load the model while the user is typing the first question
+    engine.start_keepalive()
+    
     console.print(Panel(
         f"[bold cyan]Command Explainer[/bold cyan] v{__version__}\n\n"
         f"Model: [yellow]{settings.get_model()}[/yellow]\n"
@@ -84,16 +247,38 @@ async def run_interactive(persona: str):
         "  • [bold]/generate[/bold] <description> - Generate a command\n"
         "  • [bold]/explain[/bold] <command> - Explain a command\n"
         "  • [bold]/persona[/bold] <general|security> - Switch persona\n"
+        "  • [bold]/status[/bold] - Show model load status\n"
+        "  • [bold]/reset[/bold] - Start a new conversation\n"
+        "  • [bold]/stats[/bold] - Show request performance stats\n"
         "  • [bold]/quit[/bold] or [bold]exit[/bold] - Exit",
         title="[bold]Interactive Mode[/bold]",
         border_style="blue"
     ))
     
+    session_stats: List[RequestStats] = []
+    
+    async def respond(opening, title: str):
+        generator = await opening
+        await stream_response(generator, title)
+    
+    async def run_request(coro, name: str, stats: RequestStats):
+        """Run one request as a job; a cancelled one is reported and still recorded."""
+        try:
+            result = await runner.run(coro, name)
+        except JobCancelled:
+            if stats.total_time is not None:
+                session_stats.append(stats)
+            print_cancelled(stats)
+            return None
+        session_stats.append(stats)
+        return result
+    
     try:
         while True:
             try:
-                user_input = Prompt.ask("\n[bold blue]>[/bold blue]")
-            except (EOFError, KeyboardInterrupt):
+                user_input = await runner.run(ask_async("\n[bold blue]>[/bold blue]"), "prompt")
+            except (EOFError, KeyboardInterrupt, JobCancelled):
+                # Ctrl-D, or Ctrl-C while waiting for input
                 console.print("\n[dim]Goodbye![/dim]")
                 break
             
@@ -108,9 +293,15 @@ async def run_interactive(persona: str):
             if user_input.startswith("/generate "):
                 description = user_input[10:].strip()
                 if description:
+                    stats = RequestStats()
                     try:
-                        result = await engine.generate(description, stream=False)
-                        print_command(result)
+                        result = await run_request(
+                            engine.generate(description, stream=False, stats=stats),
+                            "generate",
+                            stats
+                        )
+                        if result is not None:
+                            print_command(result)
                     except OllamaError as e:
                         print_error(str(e))
                 continue
@@ -118,13 +309,30 @@ async def run_interactive(persona: str):
             if user_input.startswith("/explain "):
                 command = user_input[9:].strip()
                 if command:
+                    stats = RequestStats()
                     try:
-                        generator = await engine.explain(command, stream=True)
-                        await stream_response(generator, "Explanation")
+                        await run_request(
+                            respond(engine.explain(command, stream=True, stats=stats), "Explanation"),
+                            "explain",
+                            stats
+                        )
                     except OllamaError as e:
                         print_error(str(e))
                 continue
             
+            if user_input.strip() == "/reset":
+                engine.reset_chat()
+                print_success("Conversation reset")
+                continue
+            
+            if user_input.strip() == "/stats":
+                print_session_stats(session_stats, engine)
+                continue
+            
+            if user_input.strip() == "/status":
+                print_status(engine)
+                continue
+            
             if user_input.startswith("/persona "):
                 new_persona = user_input[9:].strip().lower()
                 if new_persona in ("general", "security"):
@@ -135,9 +343,13 @@ async def run_interactive(persona: str):
                 continue
             
             # Default: chat mode
+            stats = RequestStats()
             try:
-                generator = await engine.chat(user_input, stream=True)
-                await stream_response(generator, "Assistant")
+                await run_request(
+                    respond(engine.chat(user_input, stream=True, stats=stats), "Assistant"),
+                    "chat",
+                    stats
+                )
             except OllamaError as e:
                 print_error(str(e))
     
@@ -162,71 +374,406 @@ def cli(ctx, persona, version):
     
     # If no subcommand, run interactive mode
     if ctx.invoked_subcommand is None:
-        asyncio.run(run_interactive(persona))
+        run_job(run_interactive(persona), "interactive")
+
+
+def write_result(output, result: "BatchResult", output_format: str, marker: str = "$"):
+    """
+    Write one batch result to the output stream.
+    
+    Text results are headed by the input after ``marker`` ("$" for a
+    command, "#" for a description, so generated output is a runnable
+    script). Output is flushed per result for use inside pipelines.
+    """
+    if output_format == "jsonl":
+        output.write(json.dumps(result.to_dict(), ensure_ascii=False) + "\n")
+    elif result.ok:
+        output.write(f"{marker} {result.input}\n{result.output.strip()}\n\n")
+    else:
+        output.write(f"{marker} {result.input}\n# error: {result.error}\n\n")
+    output.flush()
+
+
+def map_results(source, worker, concurrency: int, ordered: bool):
+    """Run a batch worker pool, emitting in input or completion order."""
+    from src.core.batch import ordered_map, unordered_map
+    
+    if ordered:
+        return ordered_map(source, worker, concurrency)
+    return unordered_map(source, worker, concurrency)
+
+
+async def run_batch(
+    source,
+    worker,
+    output,
+    output_format: str,
+    verb: str,
+    concurrency: int,
+    ordered: bool = True,
+    marker: str = "$",
+    journal: Optional["JobJournal"] = None
+) -> "Throughput":
+    """
+    Run a worker over every input line, writing results as they arrive.
+    
+    Progress goes to stderr. With a journal, finished items are
+    checkpointed and items finished by an earlier run are replayed from
+    it, so the output holds every record exactly once.
+    """
+    import asyncio
+    from src.core.batch import Throughput, enumerate_lines
+    
+    if journal is not None:
+        worker = journal.wrap(worker)
+        state = "Resuming" if journal.resumed else "Started"
+        err_console.print(
+            f"[dim]{state} job {journal.job_id} (resume with --resume {journal.job_id})[/dim]"
+        )
+    
+    throughput = Throughput()
+    results = map_results(enumerate_lines(source), worker, concurrency, ordered)
+    try:
+        with err_console.status(f"[bold blue]{verb}...[/bold blue]") as status:
+            async for result in results:
+                write_result(output, result, output_format, marker)
+                throughput.add(result)
+                status.update(
+                    f"[bold blue]{verb}[/bold blue] {throughput.done} done "
+                    f"({throughput.failed} failed) · {throughput.rate:.2f}/s"
+                )
+    except asyncio.CancelledError:
+        # In-flight items were cancelled (and their requests closed) on the way out
+        err_console.print(f"[yellow]Interrupted:[/yellow] {throughput.summary()}")
+        if journal is not None:
+            err_console.print(f"[dim]Resume with --resume {journal.job_id}[/dim]")
+        raise
+    err_console.print(f"[bold green]✓[/bold green] {throughput.summary()}")
+    return throughput
+
+
+def open_journal(job_id: Optional[str], mode: str, source) -> Optional["JobJournal"]:
+    """
+    Open (or resume) a batch job journal, exiting on a mismatched job.
+    
+    Only input from a regular file can be read again to resume, so piped
+    input is not journaled unless a job id is given with --resume.
+    """
+    import stat
+    from src.core.journal import JobJournal, JournalError
+    
+    if job_id is None:
+        try:
+            if not stat.S_ISREG(os.fstat(source.fileno()).st_mode):
+                return None
+        except (AttributeError, OSError, ValueError):
+            return None
+    try:
+        return JobJournal.open(job_id, mode)
+    except JournalError as e:
+        print_error(str(e))
+        sys.exit(1)
+
+
+def parse_generate_record(line: str) -> Dict:
+    """
+    Parse one --jsonl input record.
+    
+    A record is a JSON object with a "description" and optional "persona",
+    "os" and "shell" overrides (any other keys, such as an "id", are copied
+    to the output), or a bare JSON string used as the description.
+    """
+    from src.core.engine import Persona
+    
+    record = json.loads(line)
+    if isinstance(record, str):
+        record = {"description": record}
+    if not isinstance(record, dict) or not isinstance(record.get("description"), str):
+        raise ValueError('record must be an object with a "description" string')
+    if record.get("persona") is not None:
+        Persona(record["persona"])
+    return record
+
+
+async def generate_batch(
+    engine: "CommandEngine",
+    source,
+    output,
+    concurrency: int,
+    output_format: str = "jsonl",
+    ordered: bool = True,
+    records: bool = True,
+    journal: Optional["JobJournal"] = None
+):
+    """
+    Generate a command for every input line, with bounded concurrency.
+    
+    With ``records`` each line is a JSONL record (see parse_generate_record);
+    otherwise each line is a plain description.
+    """
+    import httpx
+    from src.core.batch import BatchResult
+    from src.core.engine import Persona
+    from src.core.ollama_client import OllamaError
+    from src.core.scheduler import Priority
+    from src.core.stats import RequestStats
+    
+    async def worker(item) -> BatchResult:
+        position, line = item
+        try:
+            record = parse_generate_record(line) if records else {"description": line}
+        except ValueError as e:
+            return BatchResult(index=position, input=line, error=f"invalid record: {e}", retry=False)
+        
+        extra = {k: v for k, v in record.items() if k != "description"}
+        result = BatchResult(
+            index=position,
+            input=record["description"],
+            stats=RequestStats(),
+            extra=extra
+        )
+        try:
+            output_text = await engine.generate(
+                record["description"],
+                stream=False,
+                stats=result.stats,
+                persona=Persona(record["persona"]) if record.get("persona") else None,
+                os_context=record.get("os"),
+                shell=record.get("shell"),
+                priority=Priority.BULK
+            )
+            result.output = output_text.strip()
+        except (OllamaError, httpx.HTTPError) as e:
+            result.error = str(e) or e.__class__.__name__
+        return result
+    
+    engine.start_keepalive()
+    await run_batch(
+        source,
+        worker,
+        output,
+        output_format,
+        "Generating",
+        concurrency,
+        ordered,
+        marker="#",
+        journal=journal
+    )
 
 
 @cli.command()
-@click.argument("description")
+@click.argument("description", required=False)
 @click.option("--persona", "-p", type=click.Choice(["general", "security"]),
               help="Set the assistant persona")
-def generate(description: str, persona: str):
-    """Generate a terminal command from a natural language description."""
+@click.option("--no-cache", is_flag=True, help="Bypass the response cache")
+@click.option("--stats", "show_stats", is_flag=True, help="Show request performance stats")
+@click.option("--jsonl", "jsonl_file", type=click.File("r"),
+              help="Generate a command for every JSONL record in FILE ('-' for stdin)")
+@click.option("--output", "-o", type=click.File("w"), default="-",
+              help="Batch output file (default: stdout)")
+@click.option("--format", "output_format", type=click.Choice(["text", "jsonl"]),
+              help="Batch output format (default: jsonl for --jsonl, text for '-')")
+@click.option("--concurrency", "-j", type=click.IntRange(min=1),
+              help="Parallel requests in batch mode (default: batch.concurrency)")
+@click.option("--ordered/--unordered", default=True,
+              help="Emit batch results in input order, or as soon as each is ready")
+@click.option("--resume", "job_id", metavar="JOB",
+              help="Resume an interrupted batch job, skipping finished items "
+                   "(piped input is only journaled with --resume)")
+def generate(
+    description: Optional[str],
+    persona: str,
+    no_cache: bool,
+    show_stats: bool,
+    jsonl_file,
+    output,
+    output_format: Optional[str],
+    concurrency: Optional[int],
+    ordered: bool,
+    job_id: Optional[str]
+):
+    """
+    Generate a terminal command from a natural language description.
+    
+    Pass "-" as DESCRIPTION to read one description per line from stdin.
+    """
+    import httpx
+    from src.core.engine import CommandEngine, Persona
+    from src.core.ollama_client import OllamaError
+    from src.config.settings import get_settings
+    
+    if jsonl_file is None and not description:
+        raise click.UsageError("Provide a DESCRIPTION, '-' or --jsonl FILE.")
+    
+    source = jsonl_file
+    if source is None and description == "-":
+        source = click.get_text_stream("stdin")
+    if job_id and source is None:
+        raise click.UsageError("--resume only applies to '-' and --jsonl batch runs.")
+    
     async def _generate():
         settings = get_settings()
         persona_enum = Persona(persona) if persona else Persona(settings.get_persona())
-        engine = CommandEngine(persona=persona_enum)
+        engine = CommandEngine(persona=persona_enum, use_cache=not no_cache)
+        
+        if source is not None:
+            journal = open_journal(job_id, "generate", source)
+            try:
+                await generate_batch(
+                    engine,
+                    source,
+                    output,
+                    concurrency or settings.batch.concurrency,
+                    output_format or ("jsonl" if jsonl_file is not None else "text"),
+                    ordered,
+                    records=jsonl_file is not None,
+                    journal=journal
+                )
+            finally:
+                if journal is not None:
+                    journal.close()
+                await engine.close()
+            return
         
         try:
-            if not await engine.check_connection():
-                print_error("Cannot connect to Ollama. Is it running?")
-                return
-            
             with console.status("[bold blue]Generating command...[/bold blue]"):
                 result = await engine.generate(description, stream=False)
             
             print_command(result.strip())
-            
-        except OllamaConnectionError as e:
-            print_error(str(e))
-        except OllamaModelNotFoundError as e:
-            print_error(str(e))
-        except OllamaError as e:
-            print_error(f"Ollama error: {e}")
+            if show_stats:
+                print_stats(engine.last_stats)
+        
+        except (OllamaError, httpx.HTTPError) as e:
+            await report_failure(engine, e)
         finally:
             await engine.close()
     
-    asyncio.run(_generate())
+    run_job(_generate(), "generate")
+
+
+async def explain_batch(
+    engine: "CommandEngine",
+    source,
+    output,
+    output_format: str,
+    concurrency: int,
+    ordered: bool = True,
+    journal: Optional["JobJournal"] = None
+):
+    """Explain every command read from a file, with bounded concurrency."""
+    import httpx
+    from src.core.batch import BatchResult
+    from src.core.ollama_client import OllamaError
+    from src.core.scheduler import Priority
+    from src.core.stats import RequestStats
+    
+    async def worker(item) -> BatchResult:
+        position, command = item
+        result = BatchResult(index=position, input=command, stats=RequestStats())
+        try:
+            result.output = await engine.explain(
+                command, stream=False, stats=result.stats, priority=Priority.BULK
+            )
+        except (OllamaError, httpx.HTTPError) as e:
+            result.error = str(e) or e.__class__.__name__
+        return result
+    
+    engine.start_keepalive()
+    await run_batch(
+        source,
+        worker,
+        output,
+        output_format,
+        "Explaining",
+        concurrency,
+        ordered,
+        journal=journal
+    )
 
 
 @cli.command()
-@click.argument("command")
+@click.argument("command", required=False)
 @click.option("--persona", "-p", type=click.Choice(["general", "security"]),
               help="Set the assistant persona")
-def explain(command: str, persona: str):
-    """Explain what a terminal command does."""
+@click.option("--no-cache", is_flag=True, help="Bypass the response cache")
+@click.option("--stats", "show_stats", is_flag=True, help="Show request performance stats")
+@click.option("--batch", "batch_file", type=click.File("r"),
+              help="Explain every command in FILE, one per line ('-' for stdin)")
+@click.option("--concurrency", "-j", type=click.IntRange(min=1),
+              help="Parallel requests in batch mode (default: batch.concurrency)")
+@click.option("--format", "output_format", type=click.Choice(["text", "jsonl"]),
+              default="text", help="Batch output format")
+@click.option("--output", "-o", type=click.File("w"), default="-",
+              help="Batch output file (default: stdout)")
+@click.option("--ordered/--unordered", default=True,
+              help="Emit batch results in input order, or as soon as each is ready")
+@click.option("--resume", "job_id", metavar="JOB",
+              help="Resume an interrupted batch job, skipping finished items "
+                   "(piped input is only journaled with --resume)")
+def explain(
+    command: Optional[str],
+    persona: str,
+    no_cache: bool,
+    show_stats: bool,
+    batch_file,
+    concurrency: Optional[int],
+    output_format: str,
+    output,
+    ordered: bool,
+    job_id: Optional[str]
+):
+    """
+    Explain what a terminal command does.
+    
+    Pass "-" as COMMAND to read one command per line from stdin.
+    """
+    import httpx
+    from src.core.engine import CommandEngine, Persona
+    from src.core.ollama_client import OllamaError
+    from src.config.settings import get_settings
+    
+    if batch_file is None and not command:
+        raise click.UsageError("Provide a COMMAND, '-' or --batch FILE.")
+    if batch_file is None and command == "-":
+        batch_file = click.get_text_stream("stdin")
+    if job_id and batch_file is None:
+        raise click.UsageError("--resume only applies to '-' and --batch runs.")
+    
     async def _explain():
         settings = get_settings()
         persona_enum = Persona(persona) if persona else Persona(settings.get_persona())
-        engine = CommandEngine(persona=persona_enum)
+        engine = CommandEngine(persona=persona_enum, use_cache=not no_cache)
+        
+        if batch_file is not None:
+            journal = open_journal(job_id, "explain", batch_file)
+            try:
+                await explain_batch(
+                    engine,
+                    batch_file,
+                    output,
+                    output_format,
+                    concurrency or settings.batch.concurrency,
+                    ordered,
+                    journal=journal
+                )
+            finally:
+                if journal is not None:
+                    journal.close()
+                await engine.close()
+            return
         
         try:
-            if not await engine.check_connection():
-                print_error("Cannot connect to Ollama. Is it running?")
-                return
-            
             generator = await engine.explain(command, stream=True)
             await stream_response(generator, "Explanation")
-            
-        except OllamaConnectionError as e:
-            print_error(str(e))
-        except OllamaModelNotFoundError as e:
-            print_error(str(e))
-        except OllamaError as e:
-            print_error(f"Ollama error: {e}")
+            if show_stats:
+                print_stats(engine.last_stats)
+        
+        except (OllamaError, httpx.HTTPError) as e:
+            await report_failure(engine, e)
         finally:
             await engine.close()
     
-    asyncio.run(_explain())
+    run_job(_explain(), "explain")
 
 
 @cli.group()
@@ -238,14 +785,14 @@ def models():
 @models.command("list")
 def list_models():
     """List available Ollama models."""
+    import httpx
+    from src.core.engine import CommandEngine
+    from src.core.ollama_client import OllamaError
+    
     async def _list():
         engine = CommandEngine()
         
         try:
-            if not await engine.check_connection():
-                print_error("Cannot connect to Ollama. Is it running?")
-                return
-            
             models_list = await engine.list_models()
             
             if not models_list:
@@ -261,13 +808,495 @@ def list_models():
                 console.print(f"  • [cyan]{name}[/cyan] ({size_gb:.1f} GB)")
             
             console.print()
+        
+        except (OllamaError, httpx.HTTPError) as e:
+            await report_failure(engine, e)
+        finally:
+            await engine.close()
+    
+    run_job(_list(), "list")
+
+
+@models.command("hosts")
+def list_hosts():
+    """Show configured Ollama hosts and their health."""
+    import httpx
+    from src.core.engine import CommandEngine
+    from src.core.ollama_client import OllamaError
+    
+    async def _hosts():
+        engine = CommandEngine(use_cache=False)
+        
+        try:
+            await engine.client.check_health()
+            try:
+                await engine.list_models()
+            except (OllamaError, httpx.HTTPError):
+                pass
             
-        except OllamaError as e:
-            print_error(str(e))
+            console.print("\n[bold]Ollama Hosts:[/bold]\n")
+            for host in engine.client.pool.status():
+                state = "[green]up[/green]" if host["healthy"] else "[red]ejected[/red]"
+                models_count = len(host["models"]) if host["models"] is not None else "?"
+                limit = f", limit {host['limit']:.1f}" if host["limit"] is not None else ""
+                console.print(
+                    f"  • [cyan]{host['url']}[/cyan] {state} "
+                    f"(weight {host['weight']:g}, {models_count} models{limit})"
+                )
+            console.print()
         finally:
             await engine.close()
     
-    asyncio.run(_list())
+    run_job(_hosts(), "hosts")
+
+
+@cli.group()
+def cache():
+    """Manage the response cache."""
+    pass
+
+
+@cache.command("stats")
+def cache_stats():
+    """Show response cache statistics."""
+    from src.core.cache import ResponseCache
+    
+    response_cache = ResponseCache()
+    try:
+        info = response_cache.stats()
+    finally:
+        response_cache.close()
+    
+    console.print("\n[bold]Response Cache:[/bold]\n")
+    console.print(f"  • Path: [cyan]{info['path']}[/cyan]")
+    console.print(f"  • Entries: {info['entries']} / {info['max_entries']}")
+    console.print(f"  • Hits: {info['hits']}")
+    console.print(f"  • Size: {info['bytes'] / 1024:.1f} KB")
+    console.print()
+
+
+@cache.command("clear")
+def cache_clear():
+    """Remove all cached responses."""
+    from src.core.cache import ResponseCache
+    
+    response_cache = ResponseCache()
+    try:
+        response_cache.clear()
+    finally:
+        response_cache.close()
+    print_success("Response cache cleared")
+
+
+@cli.group()
+def history():
+    """Precompute explanations from your shell history."""
+    pass
+
+
+async def pending_explanations(
+    engine: "CommandEngine",
+    index: "HistoryIndex",
+    limit: int
+) -> List[str]:
+    """
+    The most frequent history commands whose explanation isn't cached.
+    
+    Checked against the cache key for the engine's persona and model, so
+    commands whose entry was evicted, or explained for another persona
+    or model, come up again.
+    """
+    pending = []
+    for command in index.ranked():
+        if len(pending) >= limit:
+            break
+        key = await engine.explain_key(command)
+        if key is None or not engine.cache.contains(key):
+            pending.append(command)
+    return pending
+
+
+async def precompute_explanations(
+    engine: "CommandEngine",
+    index: "HistoryIndex",
+    commands: List[str],
+    concurrency: int
+):
+    """Explain history commands into the response cache, most frequent first."""
+    import httpx
+    from src.core.batch import BatchResult, Throughput, ordered_map
+    from src.core.ollama_client import OllamaError
+    from src.core.scheduler import Priority
+    from src.core.stats import RequestStats
+    
+    async def worker(command: str) -> BatchResult:
+        result = BatchResult(index=0, input=command, stats=RequestStats())
+        try:
+            result.output = await engine.explain(
+                command, stream=False, stats=result.stats, priority=Priority.PREFETCH
+            )
+        except (OllamaError, httpx.HTTPError) as e:
+            result.error = str(e) or e.__class__.__name__
+        return result
+    
+    async def source():
+        for command in commands:
+            yield command
+    
+    throughput = Throughput()
+    with err_console.status("[bold blue]Explaining history...[/bold blue]") as status:
+        async for result in ordered_map(source(), worker, concurrency):
+            throughput.add(result)
+            key = await engine.explain_key(result.input) if result.ok else None
+            if key is not None:
+                index.mark_explained(result.input, key)
+            status.update(
+                f"[bold blue]Explaining history[/bold blue] "
+                f"{throughput.done}/{len(commands)} ({throughput.failed} failed)"
+            )
+    err_console.print(f"[bold green]✓[/bold green] {throughput.summary()}")
+
+
+@history.command("ingest")
+@click.option("--file", "files", multiple=True, type=click.Path(exists=True, dir_okay=False),
+              help="History file to read (repeatable; default: bash and zsh history)")
+@click.option("--limit", type=click.IntRange(min=0),
+              help="Most frequent new commands to explain (default: history.limit)")
+@click.option("--concurrency", "-j", type=click.IntRange(min=1),
+              help="Parallel requests (default: history.concurrency)")
+@click.option("--persona", "-p", type=click.Choice(["general", "security"]),
+              help="Persona to precompute explanations for")
+@click.option("--background", is_flag=True, help="Run detached at low priority")
+def history_ingest(
+    files: tuple,
+    limit: Optional[int],
+    concurrency: Optional[int],
+    persona: Optional[str],
+    background: bool
+):
+    """Read new shell history and precompute explanations for it."""
+    from src.core.engine import CommandEngine, Persona
+    from src.core.history import HistoryIndex, default_history_files
+    from src.core.spawn import spawn_background
+    from src.config.settings import get_settings
+    
+    if background:
+        args = ["history", "ingest"]
+        for path in files:
+            args += ["--file", str(Path(path).resolve())]
+        if limit is not None:
+            args += ["--limit", str(limit)]
+        if concurrency is not None:
+            args += ["--concurrency", str(concurrency)]
+        if persona:
+            args += ["--persona", persona]
+        log_path = Path(get_settings().history.path).expanduser().with_suffix(".log")
+        spawn_background(args, log_path)
+        print_success(f"History ingest running in the background (log: {log_path})")
+        return
+    
+    settings = get_settings()
+    paths = [Path(p) for p in files] or default_history_files()
+    if not paths:
+        print_error("No shell history found. Pass --file or set history.files.")
+        sys.exit(1)
+    
+    index = HistoryIndex()
+    try:
+        ingested = index.ingest(paths)
+        for path, size in ingested.files.items():
+            console.print(f"  • [cyan]{path}[/cyan]: {size / 1024:.1f} KB new")
+        console.print(
+            f"  • {ingested.lines} new entries, {ingested.commands} distinct commands "
+            f"({ingested.new_commands} never seen before)"
+        )
+        
+        async def _precompute():
+            persona_enum = Persona(persona) if persona else Persona(settings.get_persona())
+            engine = CommandEngine(persona=persona_enum)
+            if engine.cache is None:
+                print_error("The response cache is disabled; nothing to precompute into.")
+                await engine.close()
+                return
+            try:
+                pending = await pending_explanations(
+                    engine,
+                    index,
+                    limit if limit is not None else settings.history.limit
+                )
+                if not pending:
+                    print_success("History is up to date")
+                    return
+                await precompute_explanations(
+                    engine,
+                    index,
+                    pending,
+                    concurrency or settings.history.concurrency
+                )
+            finally:
+                await engine.close()
+        
+        run_job(_precompute(), "history")
+    finally:
+        index.close()
+
+
+@history.command("top")
+@click.option("--limit", "-n", type=click.IntRange(min=1), default=20,
+              help="Number of commands to show")
+def history_top(limit: int):
+    """Show your most frequently used commands."""
+    from src.core.cache import ResponseCache
+    from src.core.history import HistoryIndex
+    
+    index = HistoryIndex()
+    response_cache = ResponseCache()
+    try:
+        rows = [
+            (command, count, key is not None and response_cache.contains(key))
+            for command, count, key in index.top(limit)
+        ]
+    finally:
+        index.close()
+        response_cache.close()
+    
+    table = Table(title="Most Used Commands")
+    table.add_column("Count", justify="right")
+    table.add_column("Explained")
+    table.add_column("Command", style="cyan")
+    for command, count, explained in rows:
+        table.add_row(str(count), "✓" if explained else "", command)
+    console.print(table)
+
+
+@history.command("reset")
+def history_reset():
+    """Forget ingest offsets and counts so the next ingest rereads everything."""
+    from src.core.history import HistoryIndex
+    
+    index = HistoryIndex()
+    try:
+        index.reset()
+    finally:
+        index.close()
+    print_success("History index reset")
+
+
+@cli.group()
+def daemon():
+    """Run or control cmdexd, the warm background daemon."""
+    pass
+
+
+@daemon.command("start")
+@click.option("--detach", is_flag=True, help="Run in the background")
+def daemon_start(detach: bool):
+    """
+    Serve one-shot generate/explain calls from a warm engine.
+    
+    While it runs, `cmdex generate` and `cmdex explain` are forwarded to
+    it over a Unix socket instead of starting a new engine.
+    """
+    import asyncio
+    
+    if protocol.request({"op": "status"}, timeout=1.0) is not None or protocol.lock_held():
+        print_error(f"cmdexd is already running on {protocol.socket_path()}")
+        sys.exit(1)
+    
+    if detach:
+        from src.core.spawn import spawn_background
+        
+        log_path = Path("~/.cmdex/cmdexd.log").expanduser()
+        spawn_background(["daemon", "start"], log_path, low_priority=False)
+        print_success(f"cmdexd starting in the background (log: {log_path})")
+        return
+    
+    from src.daemon import Daemon
+    
+    server = Daemon()
+    if not server.lock():
+        # Another cmdexd started since the check above
+        print_error(f"cmdexd is already running on {protocol.socket_path()}")
+        sys.exit(1)
+    console.print(f"[dim]cmdexd listening on {server.path} (Ctrl-C to stop)[/dim]")
+    asyncio.run(server.serve())
+
+
+@daemon.command("stop")
+def daemon_stop():
+    """Stop a running cmdexd."""
+    if protocol.request({"op": "shutdown"}) is None:
+        print_error("cmdexd is not responding" if protocol.lock_held() else "cmdexd is not running")
+        sys.exit(1)
+    print_success("cmdexd stopped")
+
+
+@daemon.command("status")
+def daemon_status():
+    """Show whether cmdexd is running and what it has served."""
+    reply = protocol.request({"op": "status"})
+    if reply is None or "status" not in reply:
+        state = "not responding" if protocol.lock_held() else "not running"
+        console.print(f"[dim]cmdexd is {state} ({protocol.socket_path()})[/dim]")
+        sys.exit(1)
+    status = reply["status"]
+    preload = f"{status['preload_time']:.2f}s" if status["preload_time"] is not None else "pending"
+    scheduler = status["scheduler"]
+    console.print(f"  • PID {status['pid']} on {status['socket']}")
+    console.print(f"  • Up {status['uptime']:.0f}s, {status['served']} requests served")
+    console.print(f"  • Model: [yellow]{status['model']}[/yellow] (preload {preload})")
+    console.print(
+        f"  • Scheduler: {scheduler['running']}/{scheduler['slots']} slots busy, "
+        f"{scheduler['waiting']} waiting"
+    )
+
+
+@cli.command()
+@click.option("--host", help="Address to listen on (default: serve.host, 127.0.0.1)")
+@click.option("--port", type=click.IntRange(0, 65535), help="Port to listen on (default: serve.port, 8765)")
+@click.option("--slots", type=click.IntRange(min=1),
+              help="Requests sent to Ollama at once (default: ollama.scheduler.slots)")
+def serve(host: Optional[str], port: Optional[int], slots: Optional[int]):
+    """
+    Share one warm engine over a local HTTP API.
+    
+    POST /api/generate, /api/explain and /api/chat stream NDJSON like
+    Ollama's own API; GET /api/status reports load. All callers share the
+    response cache, coalescing of identical requests and the slot limit,
+    so set --slots to the server's OLLAMA_NUM_PARALLEL.
+    """
+    import asyncio
+    from src.server import Server
+    
+    server = Server(host, port, slots)
+    if server.token is None and server.host not in ("127.0.0.1", "localhost", "::1"):
+        err_console.print(
+            "[yellow]Warning:[/yellow] no serve.token (or CMDEX_SERVE_TOKEN) is set, "
+            "so anyone who can reach this port can use it"
+        )
+    asyncio.run(server.serve(
+        lambda url: console.print(f"[dim]cmdex serve listening on {url} (Ctrl-C to stop)[/dim]")
+    ))
+
+
+@cli.command("shell-init")
+@click.argument("shell", type=click.Choice(["bash", "zsh", "fish"]))
+@click.option("--generate-key", default=r"\eg",
+              help="Key that replaces the command line with a generated command (default: Alt-g)")
+@click.option("--explain-key", default=r"\ee",
+              help="Key that explains the command line below the prompt (default: Alt-e)")
+@click.option("--deadline", type=click.FloatRange(min=0, min_open=True),
+              help="Seconds a keypress waits for an answer (default: 10)")
+def shell_init(shell: str, generate_key: str, explain_key: str, deadline: Optional[float]):
+    """
+    Print keybindings that run cmdex on the current command line.
+
+    Add `eval "$(cmdex shell-init bash)"` to ~/.bashrc (or the zsh
+    equivalent to ~/.zshrc; for fish, `cmdex shell-init fish | source` to
+    config.fish). Keys use the shell's own notation. The widgets talk to
+    cmdexd, starting it on first use, and give up when the deadline passes
+    or as soon as you type another key.
+    """
+    from src import widget
+    
+    click.echo(widget.script(shell, generate_key, explain_key, deadline or widget.DEFAULT_DEADLINE), nl=False)
+
+
+@cli.command("widget", hidden=True, context_settings={"ignore_unknown_options": True})
+@click.argument("args", nargs=-1, type=click.UNPROCESSED)
+def widget_command(args: tuple):
+    """Answer one shell keybinding (called by the shell-init scripts)."""
+    from src import widget
+    
+    sys.exit(widget.main(list(args)))
+
+
+@cli.group()
+def bench():
+    """Benchmark Ollama models."""
+    pass
+
+
+@bench.command("models")
+@click.option("--model", "-m", "model_names", multiple=True,
+              help="Model to benchmark (repeatable; default: every installed model)")
+@click.option("--mode", type=click.Choice(["all", "generate", "explain"]), default="all",
+              help="Which corpus cases to run")
+@click.option("--repeat", "-n", type=click.IntRange(min=1), default=1,
+              help="Runs per case")
+@click.option("--json", "json_output", type=click.File("w"),
+              help="Also write machine-readable results to FILE ('-' for stdout)")
+def bench_models(model_names: tuple, mode: str, repeat: int, json_output):
+    """Compare speed and answer quality across models."""
+    import httpx
+    from src.core.model_bench import CORPUS, bench_model, bench_models_report, rank
+    from src.core.ollama_client import OllamaClient, OllamaError
+    
+    cases = [c for c in CORPUS if mode == "all" or c.mode == mode]
+    
+    async def _bench():
+        client = OllamaClient()
+        try:
+            names = list(model_names)
+            if not names:
+                names = [m.get("name") for m in await client.list_models() if m.get("name")]
+            if not names:
+                print_error("No models found. Run 'ollama pull <model>' to download one.")
+                return
+            
+            reports = []
+            with err_console.status("[bold blue]Benchmarking...[/bold blue]") as status:
+                def progress(model: str, case: str):
+                    status.update(f"[bold blue]Benchmarking[/bold blue] {model} · {case}")
+                
+                for name in names:
+                    reports.append(await bench_model(client, name, cases, repeat, progress))
+        except (OllamaError, httpx.HTTPError) as e:
+            print_error(f"Benchmark failed: {e}")
+            return
+        finally:
+            await client.close()
+        
+        def fmt(value: Optional[float], unit: str, digits: int = 2) -> str:
+            return f"{value:.{digits}f}{unit}" if value is not None else "n/a"
+        
+        table = Table(title=f"Model Benchmark ({len(cases)} cases × {repeat})")
+        table.add_column("#", justify="right")
+        table.add_column("Model", style="cyan", no_wrap=True)
+        table.add_column("Quality", justify="right")
+        table.add_column("Errors", justify="right")
+        table.add_column("TTFT", justify="right")
+        table.add_column("Prefill tok/s", justify="right")
+        table.add_column("Decode tok/s", justify="right")
+        table.add_column("Peak load", justify="right")
+        failed = []
+        for position, report in enumerate(rank(reports), 1):
+            if report.error is not None:
+                failed.append(report)
+                table.add_row(str(position), report.model, "[red]failed[/red]", "", "", "", "", "")
+                continue
+            table.add_row(
+                str(position),
+                report.model,
+                f"{report.quality:.0%}",
+                str(report.errors),
+                fmt(report.ttft, "s"),
+                fmt(report.prefill_tps, "", 1),
+                fmt(report.decode_tps, "", 1),
+                fmt(report.peak_load, "s"),
+            )
+        
+        # Keep stdout clean when the JSON goes there
+        out = err_console if json_output is not None and json_output.name == "<stdout>" else console
+        out.print(table)
+        for report in failed:
+            out.print(f"[red]✗[/red] {report.model}: {report.error}")
+        
+        if json_output is not None:
+            json.dump(bench_models_report(reports, cases), json_output, indent=2)
+            json_output.write("\n")
+    
+    run_job(_bench(), "bench")
 
 
 def main():
@@ -275,5 +1304,10 @@ def main():
     cli()
 
 
+def daemon_main():
+    """cmdexd entry point: run the daemon in the foreground."""
+    cli.main(args=["daemon", "start", *sys.argv[1:]], prog_name="cmdexd")
+
+
 if __name__ == "__main__":
     main()
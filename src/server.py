@@ -0,0 +1,423 @@
+"""
+cmdex serve - HTTP API over one shared Command Explainer engine.
+Lets many users' tools on a team box share one warm model, response cache
+and scheduler; plain asyncio HTTP/1.1, no web framework.
+"""
+
+import asyncio
+import hmac
+import json
+import os
+import signal
+import time
+from dataclasses import dataclass
+from typing import AsyncGenerator, Callable, Optional, Dict, Any, List
+
+import httpx
+
+from src.config.settings import get_settings
+from src.core.engine import ChatSession, CommandEngine, Persona
+from src.core.jobs import JobRunner
+from src.core.ollama_client import OllamaError
+from src.core.stats import RequestStats
+
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Content Too Large",
+    431: "Request Header Fields Too Large",
+    502: "Bad Gateway",
+    503: "Service Unavailable",
+    505: "HTTP Version Not Supported",
+}
+
+MAX_HEADERS = 100
+
+# Endpoint -> (body field holding the text, engine mode)
+ENDPOINTS = {
+    "/api/generate": ("prompt", "generate"),
+    "/api/explain": ("command", "explain"),
+    "/api/chat": ("message", "chat"),
+}
+
+
+class HTTPError(Exception):
+    """A request answered with an error status and a JSON ``{"error": ...}`` body."""
+    
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+@dataclass
+class Request:
+    """One parsed HTTP request."""
+    method: str
+    path: str
+    version: str
+    headers: Dict[str, str]  # names lower-cased
+    body: bytes = b""
+    
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+    
+    def json(self) -> Dict[str, Any]:
+        try:
+            payload = json.loads(self.body or b"{}")
+        except ValueError as e:
+            raise HTTPError(400, f"Invalid JSON body: {e}") from e
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "The request body must be a JSON object")
+        return payload
+
+
+async def read_request(reader: asyncio.StreamReader, max_body: int) -> Optional[Request]:
+    """
+    Read one request from a connection.
+
+    Returns None when the client closed the connection instead of
+    sending (another) request.
+
+    Raises:
+        HTTPError: For a malformed or oversized request
+    """
+    try:
+        line = await reader.readline()
+        if not line:
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) != 3:
+            raise HTTPError(400, "Malformed request line")
+        method, target, version = parts
+        if version not in ("HTTP/1.0", "HTTP/1.1"):
+            raise HTTPError(505, f"Unsupported protocol {version}")
+        
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n"):
+                break
+            if not line:
+                return None
+            if len(headers) >= MAX_HEADERS:
+                raise HTTPError(431, "Too many header fields")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+    except ValueError as e:
+        # A line longer than the stream's buffer limit
+        raise HTTPError(431, "Request line or header too long") from e
+    
+    if "transfer-encoding" in headers:
+        raise HTTPError(411, "Send the body with a Content-Length")
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError as e:
+        raise HTTPError(400, "Invalid Content-Length") from e
+    if length > max_body:
+        raise HTTPError(413, f"Request bodies are limited to {max_body} bytes")
+    try:
+        body = await reader.readexactly(length) if length > 0 else b""
+    except asyncio.IncompleteReadError:
+        return None
+    return Request(method.upper(), target.split("?", 1)[0], version, headers, body)
+
+
+def response_head(status: int, headers: Dict[str, str]) -> bytes:
+    """Status line and header block of a response."""
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def json_response(status: int, payload: Dict[str, Any], keep_alive: bool,
+                  headers: Optional[Dict[str, str]] = None) -> bytes:
+    """A complete response with a JSON body."""
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+    head = {
+        "Content-Type": "application/json",
+        "Content-Length": str(len(body)),
+        "Connection": "keep-alive" if keep_alive else "close",
+    }
+    head.update(headers or {})
+    return response_head(status, head) + body
+
+
+def ndjson_record(record: Dict[str, Any], chunked: bool) -> bytes:
+    """One line of a streamed response, as a chunk when the response is chunked."""
+    line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+    if not chunked:
+        return line
+    return f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n"
+
+
+class Server:
+    """
+    Serves generate, explain and chat over HTTP from one CommandEngine.
+
+    Every user shares the engine's response cache, its coalescing of
+    identical in-flight requests and its scheduler, whose slots
+    (``ollama.scheduler.slots``, matched to OLLAMA_NUM_PARALLEL) cap the
+    requests sent to Ollama at once. Requests beyond that queue for a
+    slot; once ``serve.max_waiting`` more than the slots are in progress,
+    new ones get 503.
+
+    Responses stream as NDJSON, one ``{"response": ...}`` record per
+    chunk and a final ``{"done": true, "stats": ...}``, the same shape
+    as Ollama's own API. Chat is stateless: the final record carries the
+    conversation ``context`` for the client to send with its next turn.
+    Each connection runs as a job; a client that disconnects mid-stream
+    cancels its request and the stream to Ollama, while an unstreamed
+    request runs on so its answer is cached for the retry.
+    """
+    
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None, slots: Optional[int] = None):
+        settings = get_settings().serve
+        self.host = host or settings.host
+        self.port = settings.port if port is None else port
+        self.slots = slots
+        self.token = os.environ.get("CMDEX_SERVE_TOKEN") or settings.token
+        self.max_waiting = settings.max_waiting
+        self.max_body = settings.max_body
+        self.idle_timeout = settings.idle_timeout
+        self.engine: Optional[CommandEngine] = None
+        self.runner: Optional[JobRunner] = None
+        self.started = time.time()
+        self.counts = {"requests": 0, "cached": 0, "coalesced": 0, "failed": 0, "rejected": 0}
+        self.active = 0  # generate/explain/chat requests in progress
+        self._stop = asyncio.Event()
+    
+    async def serve(self, ready: Optional[Callable[[str], None]] = None):
+        """Listen until SIGINT or SIGTERM; ``ready`` gets the URL once bound."""
+        async with JobRunner() as runner:
+            self.runner = runner
+            loop = asyncio.get_running_loop()
+            handled: List[signal.Signals] = []
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(sig, self._stop.set)
+                    handled.append(sig)
+                except (NotImplementedError, RuntimeError):
+                    pass
+            
+            self.engine = CommandEngine()
+            if self.slots is not None:
+                self.engine.scheduler.slots = self.slots
+            self.engine.start_keepalive()
+            server = await asyncio.start_server(self._accept, self.host, self.port)
+            try:
+                host, port = server.sockets[0].getsockname()[:2]
+                if ready is not None:
+                    ready(f"http://{host}:{port}" if ":" not in host else f"http://[{host}]:{port}")
+                await self._stop.wait()
+            finally:
+                server.close()
+                for sig in handled:
+                    loop.remove_signal_handler(sig)
+                await runner.shutdown()
+                await self.engine.close()
+    
+    def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.runner.start(self._connection(reader, writer), "http")
+    
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one connection until it closes or goes idle."""
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    request = await asyncio.wait_for(read_request(reader, self.max_body), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    return
+                except HTTPError as e:
+                    writer.write(json_response(e.status, {"error": e.message}, False, e.headers))
+                    await writer.drain()
+                    return
+                if request is None:
+                    return
+                keep_alive = await self._handle(request, writer)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    async def _handle(self, request: Request, writer: asyncio.StreamWriter) -> bool:
+        """Answer one request; returns whether the connection stays open."""
+        keep_alive = request.keep_alive
+        try:
+            self._authorize(request)
+            if request.path == "/api/status":
+                if request.method != "GET":
+                    raise HTTPError(405, "Use GET", {"Allow": "GET"})
+                writer.write(json_response(200, self.status(), keep_alive))
+            elif request.path in ENDPOINTS:
+                if request.method != "POST":
+                    raise HTTPError(405, "Use POST", {"Allow": "POST"})
+                return await self._answer(request, writer)
+            else:
+                raise HTTPError(404, f"No endpoint {request.path}")
+        except HTTPError as e:
+            if e.status == 502:
+                self.counts["failed"] += 1
+            writer.write(json_response(e.status, {"error": e.message}, keep_alive, e.headers))
+        await writer.drain()
+        return keep_alive
+    
+    def _authorize(self, request: Request):
+        if self.token is None:
+            return
+        supplied = request.headers.get("authorization", "").encode("utf-8")
+        if not hmac.compare_digest(supplied, f"Bearer {self.token}".encode("utf-8")):
+            raise HTTPError(401, "Missing or wrong bearer token", {"WWW-Authenticate": "Bearer"})
+    
+    def _parse(self, request: Request) -> Dict[str, Any]:
+        """Validate a generate/explain/chat body."""
+        payload = request.json()
+        field, _ = ENDPOINTS[request.path]
+        text = payload.get(field)
+        if not isinstance(text, str) or not text.strip():
+            raise HTTPError(400, f'"{field}" must be a non-empty string')
+        persona = payload.get("persona")
+        if persona is not None:
+            try:
+                persona = Persona(persona)
+            except ValueError as e:
+                choices = ", ".join(p.value for p in Persona)
+                raise HTTPError(400, f'"persona" must be one of {choices}') from e
+        context = payload.get("context")
+        if context is not None and not (isinstance(context, list) and all(isinstance(t, int) for t in context)):
+            raise HTTPError(400, '"context" must be a list of integers')
+        return {
+            "text": text,
+            "persona": persona,
+            "stream": payload.get("stream", True) is not False,
+            "shell": payload.get("shell"),
+            "os": payload.get("os"),
+            "context": context,
+        }
+    
+    async def _start(self, mode: str, body: Dict[str, Any], stats: RequestStats, session: ChatSession):
+        """Hand a request to the engine; streams come back as async generators."""
+        engine = self.engine
+        if mode == "generate":
+            return await engine.generate(
+                body["text"],
+                stream=body["stream"],
+                stats=stats,
+                persona=body["persona"],
+                os_context=body["os"],
+                shell=engine.detect_shell(body["shell"]) if body["shell"] else None
+            )
+        if mode == "explain":
+            return await engine.explain(body["text"], stream=body["stream"], stats=stats, persona=body["persona"])
+        return await engine.chat(body["text"], stream=body["stream"], stats=stats, persona=body["persona"], session=session)
+    
+    def _final(self, mode: str, stats: RequestStats, session: ChatSession) -> Dict[str, Any]:
+        """The closing record of an answer, counting what it was served from."""
+        self.counts["cached"] += stats.cached
+        self.counts["coalesced"] += stats.coalesced
+        record: Dict[str, Any] = {"done": True, "stats": stats.to_dict()}
+        if mode == "chat":
+            record["context"] = session.context
+        return record
+    
+    async def _answer(self, request: Request, writer: asyncio.StreamWriter) -> bool:
+        """Run a generate/explain/chat request and write its answer."""
+        body = self._parse(request)
+        _, mode = ENDPOINTS[request.path]
+        # Counted here rather than from the scheduler's queue: requests
+        # arriving together all pass cache lookup before any of them queues
+        if self.active >= self.engine.scheduler.slots + self.max_waiting:
+            self.counts["rejected"] += 1
+            raise HTTPError(503, "Too many requests in progress; try again shortly", {"Retry-After": "1"})
+        
+        self.counts["requests"] += 1
+        self.active += 1
+        stats = RequestStats()
+        session = ChatSession(context=body["context"])
+        try:
+            result = await self._start(mode, body, stats, session)
+            if not body["stream"]:
+                writer.write(json_response(
+                    200, {"response": result, **self._final(mode, stats, session)}, request.keep_alive
+                ))
+                await writer.drain()
+                return request.keep_alive
+            return await self._stream(request, writer, result, mode, stats, session)
+        except (OllamaError, httpx.HTTPError) as e:
+            raise HTTPError(502, await self.engine.diagnose(e)) from e
+        finally:
+            self.active -= 1
+    
+    async def _stream(
+        self,
+        request: Request,
+        writer: asyncio.StreamWriter,
+        generator: AsyncGenerator[str, None],
+        mode: str,
+        stats: RequestStats,
+        session: ChatSession
+    ) -> bool:
+        """
+        Stream an answer as NDJSON.
+
+        The status line waits for the first chunk, so failures before it
+        still get a proper error status. A write to a client that has gone
+        raises ConnectionError, and closing the generator on the way out
+        cancels the request.
+        """
+        # HTTP/1.0 has no chunked encoding: stream until the connection closes
+        chunked = request.version != "HTTP/1.0"
+        keep_alive = request.keep_alive and chunked
+        try:
+            first = await anext(generator, None)
+            headers = {
+                "Content-Type": "application/x-ndjson",
+                "Cache-Control": "no-cache",
+                "Connection": "keep-alive" if keep_alive else "close",
+            }
+            if chunked:
+                headers["Transfer-Encoding"] = "chunked"
+            writer.write(response_head(200, headers))
+            if first is not None:
+                writer.write(ndjson_record({"response": first, "done": False}, chunked))
+            try:
+                async for chunk in generator:
+                    writer.write(ndjson_record({"response": chunk, "done": False}, chunked))
+                    await writer.drain()
+            except (OllamaError, httpx.HTTPError) as e:
+                # Too late for a status code; report it in the stream, as Ollama does
+                self.counts["failed"] += 1
+                writer.write(ndjson_record({"error": await self.engine.diagnose(e), "done": True}, chunked))
+            else:
+                writer.write(ndjson_record(self._final(mode, stats, session), chunked))
+            if chunked:
+                writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            await generator.aclose()
+        return keep_alive
+    
+    def status(self) -> Dict[str, Any]:
+        """Server state, for ``GET /api/status``."""
+        engine = self.engine
+        return {
+            "model": engine.client.model,
+            "uptime": time.time() - self.started,
+            "preload_time": engine.preload_time,
+            "connections": len(self.runner.jobs),
+            "active": self.active,
+            "max_waiting": self.max_waiting,
+            "scheduler": engine.scheduler.status(),
+            **self.counts,
+        }
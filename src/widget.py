@@ -0,0 +1,264 @@
+"""
+Shell keybinding widgets for Command Explainer.
+Scripts printed by ``cmdex shell-init`` and the ``cmdex widget`` fast path
+they call; stdlib only, like src.client, so a keypress costs one small
+interpreter start and a round trip to cmdexd.
+"""
+
+import os
+import select
+import sys
+import time
+from typing import Optional, List, Dict, Any
+
+from src.core import protocol
+
+try:
+    import termios
+except ImportError:  # pragma: no cover - not on Windows
+    termios = None
+
+
+# Exit statuses the shell scripts act on. Whatever is on stdout is shown
+# below the prompt unless a generate call succeeded, when it replaces the
+# command line.
+OK = 0
+FAILED = 1
+TIMED_OUT = 124  # same as timeout(1)
+SUPERSEDED = 125  # the user typed before the answer came; nothing to show
+
+DEFAULT_DEADLINE = 10.0
+SPAWN_GRACE = 5.0  # seconds a spawned cmdexd gets to take its lock
+SHELLS = ("bash", "zsh", "fish")
+
+SCRIPTS = {
+    "bash": r'''# cmdex shell integration for bash 4+: eval "$(cmdex shell-init bash)"
+__cmdex_widget() {{
+    local out ret
+    out=$(command cmdex widget "$1" --shell bash --deadline {deadline} -- "$READLINE_LINE")
+    ret=$?
+    if [[ $1 == generate && $ret -eq 0 ]]; then
+        READLINE_LINE=$out
+        READLINE_POINT=${{#out}}
+    elif [[ -n $out ]]; then
+        printf '\n%s\n' "$out"
+    fi
+}}
+bind -x '"{generate_key}": __cmdex_widget generate'
+bind -x '"{explain_key}": __cmdex_widget explain'
+''',
+    "zsh": r'''# cmdex shell integration for zsh: eval "$(cmdex shell-init zsh)"
+_cmdex_widget() {{
+    local out ret
+    out=$(command cmdex widget $1 --shell zsh --deadline {deadline} -- "$BUFFER")
+    ret=$?
+    if [[ $1 == generate && $ret -eq 0 ]]; then
+        BUFFER=$out
+        CURSOR=${{#BUFFER}}
+    elif [[ -n $out ]]; then
+        zle -M "$out"
+    fi
+}}
+_cmdex_generate() {{ _cmdex_widget generate }}
+_cmdex_explain() {{ _cmdex_widget explain }}
+zle -N _cmdex_generate
+zle -N _cmdex_explain
+bindkey '{generate_key}' _cmdex_generate
+bindkey '{explain_key}' _cmdex_explain
+''',
+    "fish": r'''# cmdex shell integration for fish: cmdex shell-init fish | source
+function __cmdex_widget
+    set -l out (command cmdex widget $argv[1] --shell fish --deadline {deadline} -- (commandline | string collect))
+    set -l ret $status
+    if test $argv[1] = generate; and test $ret -eq 0
+        commandline -r -- (string join \n -- $out)
+    else if test -n "$out"
+        echo
+        printf '%s\n' $out
+    end
+    commandline -f repaint
+end
+bind {generate_key} '__cmdex_widget generate'
+bind {explain_key} '__cmdex_widget explain'
+''',
+}
+
+
+def script(shell: str, generate_key: str = r"\eg", explain_key: str = r"\ee",
+           deadline: float = DEFAULT_DEADLINE) -> str:
+    """The integration script for ``shell``; keys use that shell's own notation."""
+    return SCRIPTS[shell].format(generate_key=generate_key, explain_key=explain_key, deadline=deadline)
+
+
+def parse(argv: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Parse ``{generate,explain} [--shell S] [--deadline SECONDS] -- TEXT``.
+
+    Returns None on a usage error.
+    """
+    if not argv or argv[0] not in ("generate", "explain"):
+        return None
+    request: Dict[str, Any] = {"op": argv[0], "deadline": DEFAULT_DEADLINE}
+    words = []
+    args = iter(argv[1:])
+    try:
+        for arg in args:
+            if arg == "--":
+                words.extend(args)
+            elif arg == "--shell":
+                request["shell"] = next(args)
+            elif arg == "--deadline":
+                request["deadline"] = float(next(args))
+            else:
+                words.append(arg)
+    except (StopIteration, ValueError):
+        return None
+    request["text"] = " ".join(words)
+    return request
+
+
+class TypeAhead:
+    """
+    Watches the terminal for keys typed while a widget waits.
+
+    The line editor has handed over the terminal, so anything typed now
+    sits in its input queue. Canonical mode is switched off for the wait
+    so single keys become readable; nothing is read, so the keys are still
+    there for the line editor once the widget returns.
+    """
+    
+    def __init__(self):
+        self.fd: Optional[int] = None
+        self._saved = None
+    
+    def __enter__(self) -> "TypeAhead":
+        try:
+            self.fd = os.open("/dev/tty", os.O_RDONLY | os.O_NOCTTY)
+        except OSError:
+            return self
+        if termios is not None:
+            try:
+                self._saved = termios.tcgetattr(self.fd)
+                mode = termios.tcgetattr(self.fd)
+                mode[3] &= ~(termios.ICANON | termios.ECHO)
+                mode[6][termios.VMIN] = 1
+                mode[6][termios.VTIME] = 0
+                termios.tcsetattr(self.fd, termios.TCSANOW, mode)
+            except termios.error:
+                self._saved = None
+        return self
+    
+    def __exit__(self, *exc_info):
+        if self.fd is None:
+            return
+        if self._saved is not None:
+            # TCSANOW, not TCSAFLUSH: the typed keys must survive
+            termios.tcsetattr(self.fd, termios.TCSANOW, self._saved)
+        os.close(self.fd)
+
+
+def start_daemon(deadline_at: float):
+    """
+    Start cmdexd in the background and wait for its socket, up to the deadline.
+
+    Keypresses during the daemon's startup don't spawn more: nothing is
+    started while a cmdexd holds the daemon lock, or within SPAWN_GRACE
+    of the last spawn (before the new daemon has taken the lock).
+    """
+    from pathlib import Path
+    from src.core.spawn import spawn_background
+    
+    marker = protocol.socket_path() + ".spawned"
+    try:
+        recent = time.time() - os.stat(marker).st_mtime < SPAWN_GRACE
+    except OSError:
+        recent = False
+    if not recent and not protocol.lock_held():
+        try:
+            os.makedirs(os.path.dirname(marker), mode=0o700, exist_ok=True)
+            with open(marker, "w"):
+                pass
+        except OSError:
+            pass
+        spawn_background(["daemon", "start"], Path("~/.cmdex/cmdexd.log").expanduser(), low_priority=False)
+    while time.monotonic() < deadline_at:
+        sock = protocol.connect()
+        if sock is not None:
+            return sock
+        time.sleep(0.02)
+    return None
+
+
+def run(request: Dict[str, Any]) -> int:
+    """
+    Ask cmdexd for one widget answer, writing it to stdout.
+
+    Gives up at the deadline, or as soon as the user types; either way
+    the connection is closed, which makes the daemon cancel the request
+    to Ollama. A missing daemon is started for next time.
+    """
+    text = request.get("text", "").strip()
+    if not text:
+        return FAILED
+    deadline = request["deadline"]
+    deadline_at = time.monotonic() + deadline
+    
+    sock = protocol.connect()
+    if sock is None:
+        if os.environ.get("CMDEX_NO_DAEMON"):
+            print("cmdex: widgets need cmdexd, which CMDEX_NO_DAEMON turns off")
+            return FAILED
+        sock = start_daemon(deadline_at)
+        if sock is None:
+            print(f"cmdex: cmdexd did not start within {deadline:g}s (see ~/.cmdex/cmdexd.log)")
+            return TIMED_OUT
+    
+    message = {
+        "v": protocol.VERSION,
+        "op": request["op"],
+        "text": text,
+        "plain": True,
+        "shell": request.get("shell") or os.environ.get("SHELL", ""),
+    }
+    with sock, TypeAhead() as tty:
+        sock.sendall(protocol.pack(message))
+        watch = [sock] if tty.fd is None else [sock, tty.fd]
+        parts = []
+        try:
+            while True:
+                remaining = deadline_at - time.monotonic()
+                ready = select.select(watch, [], [], remaining)[0] if remaining > 0 else []
+                if not ready:
+                    raise TimeoutError
+                if tty.fd in ready:
+                    return SUPERSEDED
+                sock.settimeout(remaining)
+                reply = protocol.recv(sock)
+                if reply is None:
+                    print("cmdex: cmdexd closed the connection")
+                    return FAILED
+                if reply.get("fallback"):
+                    print("cmdex: cmdexd is from another cmdex version; restart it with `cmdex daemon stop`")
+                    return FAILED
+                parts.append(reply.get("out", ""))
+                if "exit" in reply:
+                    sys.stdout.write("".join(parts))
+                    return int(reply["exit"])
+        except TimeoutError:
+            print(f"cmdex: no answer within {deadline:g}s")
+            return TIMED_OUT
+        except (OSError, protocol.ProtocolError) as e:
+            print(f"cmdex: {e}")
+            return FAILED
+
+
+def main(argv: List[str]) -> int:
+    """Entry point for ``cmdex widget``."""
+    request = parse(argv)
+    if request is None:
+        sys.stderr.write("usage: cmdex widget {generate,explain} [--shell S] [--deadline SECONDS] -- TEXT\n")
+        return 2
+    try:
+        return run(request)
+    except KeyboardInterrupt:
+        return SUPERSEDED